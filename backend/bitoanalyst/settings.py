@@ -73,6 +73,62 @@ if os.getenv('DATABASE_URL'):
     import dj_database_url
     DATABASES['default'] = dj_database_url.parse(os.getenv('DATABASE_URL'))
 
+# Optional read replica; read-only API views opt in with core.db_router.replica_reads
+if os.getenv('DATABASE_REPLICA_URL'):
+    import dj_database_url
+    DATABASES['replica'] = dj_database_url.parse(os.getenv('DATABASE_REPLICA_URL'))
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['core.db_router.PrimaryReplicaRouter']
+
+# Reads stay on the primary this long after a user's write (replication lag)
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '15'))
+
+# Persistent connections, checked before reuse. DB_POOL=true switches Postgres to
+# psycopg 3's connection pool instead (requires `pip install "psycopg[binary,pool]"`).
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', '60'))
+DB_POOL = os.getenv('DB_POOL', 'False').lower() == 'true'
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '2'))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+
+for _database in DATABASES.values():
+    if DB_POOL and _database['ENGINE'] == 'django.db.backends.postgresql':
+        _database.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': DB_POOL_MIN_SIZE,
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': 10,
+        }
+        # Django refuses persistent connections on top of a pool.
+        _database['CONN_MAX_AGE'] = 0
+    else:
+        _database['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+        _database['CONN_HEALTH_CHECKS'] = True
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bitoanalyst',
+        'OPTIONS': {'MAX_ENTRIES': 500},
+    }
+}
+
+# Shared cache for multi-process deployments (requires `pip install redis`)
+if os.getenv('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL'),
+    }
+
+# Read-your-writes pins live in the cache, so every worker must see the same one.
+if 'replica' in DATABASES and CACHES['default']['BACKEND'] in (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+):
+    from django.core.exceptions import ImproperlyConfigured
+    raise ImproperlyConfigured(
+        "DATABASE_REPLICA_URL requires a shared cache backend; set REDIS_URL."
+    )
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -109,3 +165,31 @@ AUTH_TOKEN_TTL_SECONDS = int(os.getenv('AUTH_TOKEN_TTL_SECONDS', '21600'))
 
 # Cerebras API Key
 CEREBRAS_API_KEY = os.getenv('CEREBRAS_API_KEY')
+
+# Parallel map-stage LLM calls for portfolio analyses
+PORTFOLIO_MAX_WORKERS = int(os.getenv('PORTFOLIO_MAX_WORKERS', '4'))
+
+# Rendered bodies of completed analyses served by GET /api/results/<id>/. The
+# timeout bounds how long other processes may serve a result deleted elsewhere.
+RESULT_CACHE_TIMEOUT = int(os.getenv('RESULT_CACHE_TIMEOUT', '300'))
+RESULT_CACHE_MAX_BYTES = int(os.getenv('RESULT_CACHE_MAX_BYTES', str(256 * 1024)))
+
+# What-if simulation results are cached per snapshot and grid
+SIMULATION_CACHE_TIMEOUT = int(os.getenv('SIMULATION_CACHE_TIMEOUT', '3600'))
+
+# Admin bulk re-analysis: worker threads, and when pending/processing counts as stuck
+REANALYSIS_MAX_WORKERS = int(os.getenv('REANALYSIS_MAX_WORKERS', '2'))
+STALE_ANALYSIS_MINUTES = int(os.getenv('STALE_ANALYSIS_MINUTES', '30'))
+
+# Idempotency-Key header support for POST endpoints
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv('IDEMPOTENCY_KEY_TTL_HOURS', '24'))
+
+# Data retention (see `python manage.py apply_retention`)
+ANALYSIS_RETENTION_DAYS = int(os.getenv('ANALYSIS_RETENTION_DAYS', '365'))
+FAILED_ANALYSIS_RETENTION_DAYS = int(os.getenv('FAILED_ANALYSIS_RETENTION_DAYS', '30'))
+ORPHAN_SNAPSHOT_GRACE_HOURS = int(os.getenv('ORPHAN_SNAPSHOT_GRACE_HOURS', '1'))
+RETENTION_BATCH_SIZE = int(os.getenv('RETENTION_BATCH_SIZE', '100'))
+RETENTION_ARCHIVE_DIR = os.getenv('RETENTION_ARCHIVE_DIR', str(BASE_DIR / 'archive'))
+
+# Pipeline traces are exported as OTLP/JSON when set, e.g. http://localhost:4318
+OTEL_EXPORTER_OTLP_ENDPOINT = os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT', '')
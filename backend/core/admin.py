@@ -1,19 +1,123 @@
-from django.contrib import admin
+import json
+
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ChangeList
+from django.utils.html import format_html
+
 from .models import ErpSnapshot, AnalysisResult
+from .services.ai_analyzer import STAGES
+from .services.reanalysis import needs_reanalysis, queue_reanalysis
+
+# Longer JSON values are cut in the detail view; the API returns them in full.
+JSON_PREVIEW_CHARS = 5000
+
+
+def _json_preview(value):
+    text = json.dumps(value, indent=2, ensure_ascii=False, default=str)
+    if len(text) > JSON_PREVIEW_CHARS:
+        text = f"{text[:JSON_PREVIEW_CHARS]}\n... truncated, {len(text)} characters in total"
+    return format_html('<pre style="white-space: pre-wrap">{}</pre>', text)
+
+
+def _analyses(count):
+    return f"{count} {'analysis' if count == 1 else 'analyses'}"
+
+
+def _deferring_changelist(*fields):
+    """ChangeList class that leaves large JSON columns out of the list query."""
+    class DeferredChangeList(ChangeList):
+        def get_queryset(self, request, exclude_parameters=None):
+            return super().get_queryset(request, exclude_parameters).defer(*fields)
+
+    return DeferredChangeList
+
 
 @admin.register(ErpSnapshot)
 class ErpSnapshotAdmin(admin.ModelAdmin):
-    list_display = ['id', 'created_at', 'updated_at']
+    list_display = ['id', 'series', 'created_at', 'updated_at']
     list_filter = ['created_at']
-    search_fields = ['id']
+    search_fields = ['id', 'series']
     readonly_fields = ['created_at', 'updated_at']
+    raw_id_fields = ['previous']
+
+    def get_changelist(self, request, **kwargs):
+        return _deferring_changelist('raw_data', 'profile', 'delta')
 
 @admin.register(AnalysisResult)
 class AnalysisResultAdmin(admin.ModelAdmin):
-    list_display = ['id', 'erp_snapshot', 'status', 'created_at', 'updated_at']
+    list_display = ['id', 'erp_snapshot', 'name', 'status', 'progress', 'created_at', 'updated_at']
     list_filter = ['status', 'created_at']
+    list_select_related = ['erp_snapshot']
     search_fields = ['id', 'erp_snapshot__id']
-    readonly_fields = ['created_at', 'updated_at']
-    
+    fields = [
+        'erp_snapshot', 'name', 'status', 'error_message', 'stage_status',
+        'cleaning_analysis_preview', 'business_strategy_preview', 'erp_actions_preview',
+        'trace_preview', 'created_at', 'updated_at',
+    ]
+    readonly_fields = [
+        'erp_snapshot', 'stage_status', 'cleaning_analysis_preview', 'business_strategy_preview',
+        'erp_actions_preview', 'trace_preview', 'created_at', 'updated_at',
+    ]
+    actions = ['resume_missing_stages', 'rerun_all_stages']
+
     def has_add_permission(self, request):
-        return False
\ No newline at end of file
+        return False
+
+    def get_changelist(self, request, **kwargs):
+        return _deferring_changelist(
+            'cleaning_analysis', 'business_strategy', 'erp_actions', 'trace',
+            'erp_snapshot__raw_data', 'erp_snapshot__profile', 'erp_snapshot__delta',
+        )
+
+    @admin.display(description='Progress')
+    def progress(self, obj):
+        done = sum(1 for stage in STAGES if obj.stage_status.get(stage) == 'completed')
+        failed = [stage for stage in STAGES if obj.stage_status.get(stage) == 'failed']
+        text = f"{done}/{len(STAGES)} stages"
+        if failed:
+            text += f", {failed[0]} failed"
+        elif needs_reanalysis(obj):
+            text += ", stale"
+        return text
+
+    @admin.display(description='Cleaning analysis')
+    def cleaning_analysis_preview(self, obj):
+        return _json_preview(obj.cleaning_analysis)
+
+    @admin.display(description='Business strategy')
+    def business_strategy_preview(self, obj):
+        return _json_preview(obj.business_strategy)
+
+    @admin.display(description='ERP actions')
+    def erp_actions_preview(self, obj):
+        return _json_preview(obj.erp_actions)
+
+    @admin.display(description='Trace')
+    def trace_preview(self, obj):
+        return _json_preview(obj.trace)
+
+    def _queue(self, request, queryset, restart):
+        selected = list(queryset.values_list('id', flat=True))
+        queued = queue_reanalysis(selected, restart=restart)
+        skipped = len(selected) - len(queued)
+        if queued:
+            self.message_user(
+                request,
+                f"Queued {_analyses(len(queued))} for re-analysis. "
+                f"Refresh this page to follow their progress.",
+                messages.SUCCESS
+            )
+        if skipped:
+            self.message_user(
+                request,
+                f"Skipped {_analyses(skipped)}: only failed or stale analyses can be re-analyzed.",
+                messages.WARNING
+            )
+
+    @admin.action(description="Re-analyze selected: resume missing stages (failed or stale only)")
+    def resume_missing_stages(self, request, queryset):
+        self._queue(request, queryset, restart=False)
+
+    @admin.action(description="Re-analyze selected: re-run all stages (failed or stale only)")
+    def rerun_all_stages(self, request, queryset):
+        self._queue(request, queryset, restart=True)
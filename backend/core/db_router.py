@@ -0,0 +1,74 @@
+import contextvars
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+REPLICA = 'replica'
+
+_replica_reads = contextvars.ContextVar('replica_reads', default=False)
+
+
+def _pin_key(email):
+    return f"db-primary-pin:{email}"
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends reads to the ``replica`` database inside views decorated with
+    ``replica_reads``; everything else, including all writes, uses ``default``.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and REPLICA in settings.DATABASES:
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
+
+
+def replica_reads(view_func):
+    """
+    Serve a read-only view from the replica, unless the caller wrote recently.
+
+    Place it below ``require_api_auth`` so ``request.auth_email`` is set.
+    """
+    @wraps(view_func)
+    def wrapped(request, *args, **kwargs):
+        if REPLICA not in settings.DATABASES or cache.get(_pin_key(request.auth_email)):
+            return view_func(request, *args, **kwargs)
+        token = _replica_reads.set(True)
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+
+    return wrapped
+
+
+def pins_primary(view_func):
+    """
+    Read-your-writes for a writing view: the caller's reads stay on the primary
+    for REPLICA_PIN_SECONDS after the view starts and after it finishes, so a
+    long synchronous analysis is covered too.
+    """
+    @wraps(view_func)
+    def wrapped(request, *args, **kwargs):
+        if REPLICA not in settings.DATABASES:
+            return view_func(request, *args, **kwargs)
+        key = _pin_key(request.auth_email)
+        cache.set(key, True, settings.REPLICA_PIN_SECONDS)
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            cache.set(key, True, settings.REPLICA_PIN_SECONDS)
+
+    return wrapped
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from core.services.retention import RetentionEngine
+
+
+class Command(BaseCommand):
+    help = "Archive and delete expired analyses and orphaned ERP snapshots in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help="Retention for completed analyses.")
+        parser.add_argument('--failed-days', type=int, help="Retention for failed analyses.")
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--archive-dir', help="Directory for compressed NDJSON archives.")
+        parser.add_argument(
+            '--no-archive',
+            action='store_true',
+            help="Delete without writing an archive file."
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Report what would be deleted without changing anything."
+        )
+
+    def handle(self, *args, **options):
+        engine = RetentionEngine(
+            retention_days=options['days'],
+            failed_retention_days=options['failed_days'],
+            batch_size=options['batch_size'],
+            archive_dir=options['archive_dir'],
+            archive=not options['no_archive'],
+            dry_run=options['dry_run'],
+        )
+        report = engine.run()
+
+        prefix = "Would delete" if report['dry_run'] else "Deleted"
+        for reason, count in report['snapshots_deleted'].items():
+            self.stdout.write(f"{prefix} {count} {reason} snapshots")
+        self.stdout.write(f"{prefix} {report['analyses_deleted']} analyses")
+        if not report['dry_run']:
+            self.stdout.write(f"Deleted {report['idempotency_keys_deleted']} expired idempotency keys")
+            self.stdout.write(f"Deleted {report['unit_results_deleted']} cached portfolio unit results")
+        if report['archive_path']:
+            self.stdout.write(f"Archived to {report['archive_path']}")
+        verb = "Would reclaim" if report['dry_run'] else "Reclaimed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {report['bytes_reclaimed']} bytes of JSON payload"
+        ))
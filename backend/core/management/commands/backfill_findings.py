@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from core.models import AnalysisResult
+from core.services.findings import sync_findings_batch
+
+
+class Command(BaseCommand):
+    help = "Extract RedFlag and Problem rows from existing completed analyses."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument(
+            '--only-missing',
+            action='store_true',
+            help="Skip analyses that already have extracted findings."
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = (
+            AnalysisResult.objects.filter(status='completed')
+            .only('id', 'created_at', 'cleaning_analysis', 'business_strategy')
+            .order_by('id')
+        )
+        if options['only_missing']:
+            queryset = queryset.filter(red_flags__isnull=True, problems__isnull=True)
+
+        last_id = 0
+        totals = {'analyses': 0, 'red_flags': 0, 'problems': 0}
+        while True:
+            # Keyset pagination keeps each batch query cheap on large tables.
+            batch = list(queryset.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            flags, problems = sync_findings_batch(batch)
+            last_id = batch[-1].id
+            totals['analyses'] += len(batch)
+            totals['red_flags'] += flags
+            totals['problems'] += problems
+            self.stdout.write(f"Processed analyses up to id {last_id}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Backfilled {totals['red_flags']} red flags and {totals['problems']} problems "
+            f"from {totals['analyses']} analyses"
+        ))
@@ -0,0 +1,72 @@
+import copy
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.utils import load_backend
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-request database cost with a new connection per request "
+        "against the configured connection settings (persistent or pooled)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--requests', type=int, default=200)
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        if alias not in connections.settings:
+            raise CommandError(f"Unknown database alias: {alias}")
+
+        configured = copy.deepcopy(connections[alias].settings_dict)
+        baseline = copy.deepcopy(configured)
+        baseline['CONN_MAX_AGE'] = 0
+        baseline['CONN_HEALTH_CHECKS'] = False
+        baseline.get('OPTIONS', {}).pop('pool', None)
+
+        if 'pool' in configured.get('OPTIONS', {}):
+            mode = 'pooled'
+        else:
+            mode = f"persistent (CONN_MAX_AGE={configured['CONN_MAX_AGE']})"
+        self.stdout.write(
+            f"{configured['ENGINE']} on {alias}, {options['requests']} simulated requests"
+        )
+
+        results = [
+            ('new connection per request', self.run(baseline, f'{alias}-baseline', options['requests'])),
+            (mode, self.run(configured, f'{alias}-configured', options['requests'])),
+        ]
+        for label, timings in results:
+            timings.sort()
+            self.stdout.write(
+                f"  {label:<40} mean {statistics.mean(timings):7.2f} ms  "
+                f"p50 {timings[len(timings) // 2]:7.2f} ms  "
+                f"p95 {timings[int(len(timings) * 0.95) - 1]:7.2f} ms"
+            )
+
+        saved = statistics.mean(results[0][1]) - statistics.mean(results[1][1])
+        self.stdout.write(self.style.SUCCESS(f"Connection overhead saved per request: {saved:.2f} ms"))
+
+    def run(self, settings_dict, alias, requests):
+        """Time a trivial query per request, ending each request like Django does."""
+        backend = load_backend(settings_dict['ENGINE'])
+        wrapper = backend.DatabaseWrapper(settings_dict, alias)
+        timings = []
+        try:
+            for _ in range(requests):
+                started = time.perf_counter()
+                with wrapper.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+                # What the request_finished signal does at the end of every request.
+                wrapper.close_if_unusable_or_obsolete()
+                timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            wrapper.close()
+            if hasattr(wrapper, 'close_pool'):
+                wrapper.close_pool()
+        return timings
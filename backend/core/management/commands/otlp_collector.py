@@ -0,0 +1,78 @@
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a minimal OTLP/HTTP JSON collector that prints received spans. "
+        "Point OTEL_EXPORTER_OTLP_ENDPOINT at it for local debugging."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=4318)
+        parser.add_argument(
+            '--output',
+            help="Also append every received payload to this file as NDJSON."
+        )
+
+    def handle(self, *args, **options):
+        command = self
+        output = options['output']
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path != '/v1/traces':
+                    self.send_error(404)
+                    return
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                try:
+                    payload = json.loads(body)
+                except ValueError:
+                    self.send_error(400, "Expected an OTLP/JSON body")
+                    return
+
+                command.print_spans(payload)
+                if output:
+                    with open(output, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(payload) + '\n')
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.end_headers()
+                self.wfile.write(b'{}')
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((options['host'], options['port']), Handler)
+        self.stdout.write(f"Listening on http://{options['host']}:{options['port']}/v1/traces")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+    def print_spans(self, payload):
+        for resource_spans in payload.get('resourceSpans', []):
+            resource = {
+                attribute['key']: next(iter(attribute['value'].values()))
+                for attribute in resource_spans.get('resource', {}).get('attributes', [])
+            }
+            for scope_spans in resource_spans.get('scopeSpans', []):
+                spans = scope_spans.get('spans', [])
+                if not spans:
+                    continue
+                self.stdout.write(self.style.SUCCESS(
+                    f"trace {spans[0]['traceId']} analysis={resource.get('analysis.id')} "
+                    f"({len(spans)} spans)"
+                ))
+                for otlp_span in spans:
+                    duration_ms = (
+                        int(otlp_span['endTimeUnixNano']) - int(otlp_span['startTimeUnixNano'])
+                    ) / 1e6
+                    status = ' ERROR' if otlp_span.get('status', {}).get('code') == 2 else ''
+                    self.stdout.write(f"  {otlp_span['name']:<32} {duration_ms:10.2f} ms{status}")
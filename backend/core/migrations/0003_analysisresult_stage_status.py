@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+STAGES = ('cleaning_analysis', 'business_strategy', 'erp_actions')
+
+
+def populate_stage_status(apps, schema_editor):
+    AnalysisResult = apps.get_model('core', 'AnalysisResult')
+    for analysis in AnalysisResult.objects.all().iterator():
+        analysis.stage_status = {
+            stage: 'completed' for stage in STAGES if getattr(analysis, stage)
+        }
+        analysis.save(update_fields=['stage_status'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_analysisresult_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisresult',
+            name='stage_status',
+            field=models.JSONField(default=dict, help_text='Per-stage status keyed by stage name: completed or failed'),
+        ),
+        migrations.RunPython(populate_stage_status, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_analysisresult_stage_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RedFlag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('severity', models.CharField(max_length=20)),
+                ('category', models.CharField(max_length=50)),
+                ('metric', models.CharField(blank=True, default='', max_length=255)),
+                ('value', models.FloatField(blank=True, null=True)),
+                ('threshold', models.FloatField(blank=True, null=True)),
+                ('description', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField()),
+                ('analysis', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='red_flags', to='core.analysisresult')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [
+                    models.Index(fields=['severity', 'category', 'created_at'], name='redflag_sev_cat_created_idx'),
+                    models.Index(fields=['category', 'created_at'], name='redflag_cat_created_idx'),
+                    models.Index(fields=['metric'], name='redflag_metric_idx'),
+                    models.Index(fields=['created_at'], name='redflag_created_idx'),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name='Problem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('problem', models.TextField(blank=True, default='')),
+                ('category', models.CharField(max_length=50)),
+                ('action_priority', models.CharField(blank=True, default='', max_length=20)),
+                ('root_cause', models.TextField(blank=True, default='')),
+                ('recommended_action', models.TextField(blank=True, default='')),
+                ('financial_impact', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField()),
+                ('analysis', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='problems', to='core.analysisresult')),
+            ],
+            options={
+                'ordering': ['-created_at', 'rank'],
+                'indexes': [
+                    models.Index(fields=['category', 'created_at'], name='problem_cat_created_idx'),
+                    models.Index(fields=['action_priority', 'created_at'], name='problem_priority_created_idx'),
+                    models.Index(fields=['created_at'], name='problem_created_idx'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_redflag_problem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='erpsnapshot',
+            name='profile',
+            field=models.JSONField(default=dict, help_text='Statistical profile of tables detected in raw_data'),
+        ),
+    ]
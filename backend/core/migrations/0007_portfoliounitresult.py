@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioUnitResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data_hash', models.CharField(help_text="SHA-256 of the unit's ERP data and the model used", max_length=64, unique=True)),
+                ('ratios', models.JSONField(default=dict)),
+                ('cleaning_analysis', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_portfoliounitresult'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='erpsnapshot',
+            name='delta',
+            field=models.JSONField(default=dict, help_text='Metric-level diff against the previous snapshot'),
+        ),
+        migrations.AddField(
+            model_name='erpsnapshot',
+            name='previous',
+            field=models.ForeignKey(blank=True, help_text='Previous analyzed snapshot in the same series', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='next_snapshots', to='core.erpsnapshot'),
+        ),
+        migrations.AddField(
+            model_name='erpsnapshot',
+            name='series',
+            field=models.CharField(blank=True, db_index=True, default='', help_text='Groups consecutive submissions for the same business', max_length=120),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_erpsnapshot_series_delta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisresult',
+            name='trace',
+            field=models.JSONField(default=dict, help_text='Timing spans of the most recent pipeline runs'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:54
+
+from django.db import migrations, models
+
+
+def mark_portfolio_snapshots(apps, schema_editor):
+    """Existing portfolio snapshots are the ones holding analyze_portfolio's unit list."""
+    ErpSnapshot = apps.get_model('core', 'ErpSnapshot')
+    portfolio_ids = [
+        snapshot.id
+        for snapshot in ErpSnapshot.objects.filter(raw_data__has_key='portfolio').only('id', 'raw_data')
+        if isinstance(snapshot.raw_data['portfolio'], list) and all(
+            isinstance(unit, dict) and set(unit) == {'name', 'raw_data'}
+            for unit in snapshot.raw_data['portfolio']
+        )
+    ]
+    ErpSnapshot.objects.filter(id__in=portfolio_ids).update(kind='portfolio')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_analysisresult_trace'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='erpsnapshot',
+            name='kind',
+            field=models.CharField(choices=[('standard', 'Standard'), ('portfolio', 'Portfolio')], default='standard', help_text="Portfolio snapshots hold several business units under raw_data['portfolio']", max_length=20),
+        ),
+        migrations.RunPython(mark_portfolio_snapshots, migrations.RunPython.noop),
+    ]
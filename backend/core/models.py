@@ -2,11 +2,45 @@ from django.db import models
 
 class ErpSnapshot(models.Model):
     """Stores raw ERP data from different modules."""
+    KIND_CHOICES = [
+        ('standard', 'Standard'),
+        ('portfolio', 'Portfolio'),
+    ]
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     raw_data = models.JSONField(
         help_text="Raw ERP data including Sales, Warehouse, Finance, CRM"
     )
+    profile = models.JSONField(
+        default=dict,
+        help_text="Statistical profile of tables detected in raw_data"
+    )
+    series = models.CharField(
+        max_length=120,
+        blank=True,
+        default='',
+        db_index=True,
+        help_text="Groups consecutive submissions for the same business"
+    )
+    previous = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        related_name='next_snapshots',
+        null=True,
+        blank=True,
+        help_text="Previous analyzed snapshot in the same series"
+    )
+    delta = models.JSONField(
+        default=dict,
+        help_text="Metric-level diff against the previous snapshot"
+    )
+    kind = models.CharField(
+        max_length=20,
+        choices=KIND_CHOICES,
+        default='standard',
+        help_text="Portfolio snapshots hold several business units under raw_data['portfolio']"
+    )
     
     class Meta:
         ordering = ['-created_at']
@@ -52,9 +86,119 @@ class AnalysisResult(models.Model):
         default=dict,
         help_text="Specific Bito ERP module configuration changes"
     )
+    stage_status = models.JSONField(
+        default=dict,
+        help_text="Per-stage status keyed by stage name: completed or failed"
+    )
+    trace = models.JSONField(
+        default=dict,
+        help_text="Timing spans of the most recent pipeline runs"
+    )
     
     class Meta:
         ordering = ['-created_at']
     
     def __str__(self):
         return f"Analysis {self.id} - {self.get_status_display()}"
+
+    def completed_stages(self):
+        """Return the outputs of stages that have already finished."""
+        return {
+            stage: getattr(self, stage)
+            for stage, stage_state in self.stage_status.items()
+            if stage_state == 'completed'
+        }
+
+
+class RedFlag(models.Model):
+    """A single red flag extracted from an analysis' cleaning_analysis."""
+    analysis = models.ForeignKey(
+        AnalysisResult,
+        on_delete=models.CASCADE,
+        related_name='red_flags'
+    )
+    severity = models.CharField(max_length=20)
+    category = models.CharField(max_length=50)
+    metric = models.CharField(max_length=255, blank=True, default='')
+    value = models.FloatField(null=True, blank=True)
+    threshold = models.FloatField(null=True, blank=True)
+    description = models.TextField(blank=True, default='')
+    # Copied from the parent analysis so time-range queries need no join.
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['severity', 'category', 'created_at'], name='redflag_sev_cat_created_idx'),
+            models.Index(fields=['category', 'created_at'], name='redflag_cat_created_idx'),
+            models.Index(fields=['metric'], name='redflag_metric_idx'),
+            models.Index(fields=['created_at'], name='redflag_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"RedFlag {self.id} - {self.severity} {self.category}"
+
+
+class Problem(models.Model):
+    """A single top problem extracted from an analysis' business_strategy."""
+    analysis = models.ForeignKey(
+        AnalysisResult,
+        on_delete=models.CASCADE,
+        related_name='problems'
+    )
+    rank = models.PositiveSmallIntegerField(null=True, blank=True)
+    problem = models.TextField(blank=True, default='')
+    category = models.CharField(max_length=50)
+    action_priority = models.CharField(max_length=20, blank=True, default='')
+    root_cause = models.TextField(blank=True, default='')
+    recommended_action = models.TextField(blank=True, default='')
+    financial_impact = models.TextField(blank=True, default='')
+    # Copied from the parent analysis so time-range queries need no join.
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at', 'rank']
+        indexes = [
+            models.Index(fields=['category', 'created_at'], name='problem_cat_created_idx'),
+            models.Index(fields=['action_priority', 'created_at'], name='problem_priority_created_idx'),
+            models.Index(fields=['created_at'], name='problem_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Problem {self.id} - #{self.rank} {self.category}"
+
+
+class PortfolioUnitResult(models.Model):
+    """Cached map-stage output for one business unit of a portfolio analysis."""
+    data_hash = models.CharField(
+        max_length=64,
+        unique=True,
+        help_text="SHA-256 of the unit's ERP data and the model used"
+    )
+    ratios = models.JSONField(default=dict)
+    cleaning_analysis = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"PortfolioUnitResult {self.data_hash[:12]}"
+
+
+class IdempotencyKey(models.Model):
+    """Client-supplied Idempotency-Key mapped to the analysis it started."""
+    key = models.CharField(max_length=255, unique=True)
+    request_hash = models.CharField(
+        max_length=64,
+        help_text="SHA-256 of the request body the key was first used with"
+    )
+    analysis = models.ForeignKey(
+        AnalysisResult,
+        on_delete=models.CASCADE,
+        related_name='idempotency_keys',
+        null=True,
+        blank=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"IdempotencyKey {self.key}"
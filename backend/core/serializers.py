@@ -1,11 +1,15 @@
 from rest_framework import serializers
-from .models import ErpSnapshot, AnalysisResult
+from .models import ErpSnapshot, AnalysisResult, RedFlag, Problem
+from .services.simulator import MAX_GRID_VALUES
 
 class ErpSnapshotSerializer(serializers.ModelSerializer):
     class Meta:
         model = ErpSnapshot
-        fields = ['id', 'raw_data', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        fields = [
+            'id', 'raw_data', 'profile', 'series', 'previous', 'delta',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'profile', 'previous', 'delta', 'created_at', 'updated_at']
 
 
 class AnalysisResultSerializer(serializers.ModelSerializer):
@@ -16,11 +20,40 @@ class AnalysisResultSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'erp_snapshot', 'status', 'name', 'error_message',
             'cleaning_analysis', 'business_strategy', 'erp_actions',
-            'created_at', 'updated_at'
+            'stage_status', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
+class ErpSnapshotListSerializer(ErpSnapshotSerializer):
+    """Snapshot without its profile and delta, which only the detail endpoint returns."""
+    class Meta(ErpSnapshotSerializer.Meta):
+        fields = ['id', 'raw_data', 'series', 'previous', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'previous', 'created_at', 'updated_at']
+
+
+class AnalysisResultListSerializer(AnalysisResultSerializer):
+    erp_snapshot = ErpSnapshotListSerializer(read_only=True)
+
+
+class RedFlagSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RedFlag
+        fields = [
+            'id', 'analysis', 'severity', 'category', 'metric',
+            'value', 'threshold', 'description', 'created_at'
+        ]
+
+
+class ProblemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Problem
+        fields = [
+            'id', 'analysis', 'rank', 'problem', 'category', 'action_priority',
+            'root_cause', 'recommended_action', 'financial_impact', 'created_at'
+        ]
+
+
 class AnalysisRequestSerializer(serializers.Serializer):
     """Serializer for incoming ERP data analysis requests."""
     name = serializers.CharField(required=False, allow_blank=True)
@@ -29,9 +62,58 @@ class AnalysisRequestSerializer(serializers.Serializer):
     warehouse = serializers.DictField(required=False)
     finance = serializers.DictField(required=False)
     crm = serializers.DictField(required=False)
+    series = serializers.CharField(required=False, allow_blank=True, max_length=120)
+    incremental = serializers.BooleanField(required=False)
 
     def validate(self, data):
         # Accept flexible schemas; if nothing provided, reject.
         if not data:
             raise serializers.ValidationError("No data provided for analysis.")
         return data
+
+
+class PortfolioUnitSerializer(AnalysisRequestSerializer):
+    """One business unit of a portfolio request; same data shape as a single analysis."""
+    name = serializers.CharField()
+    series = None
+    incremental = None
+
+    def validate(self, data):
+        if set(data) == {'name'}:
+            raise serializers.ValidationError("No data provided for unit.")
+        return data
+
+
+class PortfolioRequestSerializer(serializers.Serializer):
+    """Serializer for multi-unit portfolio analysis requests."""
+    name = serializers.CharField(required=False, allow_blank=True)
+    units = PortfolioUnitSerializer(many=True)
+
+    def validate_units(self, units):
+        if len(units) < 2:
+            raise serializers.ValidationError("A portfolio needs at least two units.")
+        names = [unit['name'] for unit in units]
+        if len(set(names)) != len(names):
+            raise serializers.ValidationError("Unit names must be unique.")
+        return units
+
+
+class SimulationRequestSerializer(serializers.Serializer):
+    """Parameter deltas (one scenario) and/or grids (all combinations) to simulate."""
+    mode = serializers.ChoiceField(choices=['relative', 'absolute'], default='relative')
+    deltas = serializers.DictField(child=serializers.FloatField(), required=False)
+    grid = serializers.DictField(
+        child=serializers.ListField(
+            child=serializers.FloatField(), min_length=1, max_length=MAX_GRID_VALUES
+        ),
+        required=False
+    )
+    max_results = serializers.IntegerField(min_value=1, max_value=1000, default=50)
+
+    def validate(self, data):
+        grid = {path: [value] for path, value in data.get('deltas', {}).items()}
+        grid.update(data.get('grid', {}))
+        if not grid:
+            raise serializers.ValidationError("Provide deltas or grid.")
+        data['grid'] = grid
+        return data
@@ -3,9 +3,116 @@ import json
 import logging
 from cerebras.cloud.sdk import Cerebras
 from django.conf import settings
+from .profiler import compact_raw_data
+from .tracing import current_span, span
 
 logger = logging.getLogger(__name__)
 
+# Analysis stages in execution order; each name matches an AnalysisResult field.
+STAGES = ('cleaning_analysis', 'business_strategy', 'erp_actions')
+
+# Red flag thresholds per ratio: (direction, high, medium). "above" means the
+# ratio is a red flag when it exceeds the threshold, "below" when it falls under.
+SEVERITY_THRESHOLDS = {
+    'cancellation_rate': ('above', 15, 10),
+    'stockout_rate': ('above', 10, 5),
+    'dead_stock_rate': ('above', 20, 15),
+    'net_profit_margin': ('below', 5, 10),
+    'conversion_rate': ('below', 15, 20),
+}
+
+BUSINESS_STRATEGY_FORMAT = """Respond ONLY with a valid JSON object in this exact format:
+{
+    "executive_summary": "2-3 sentence summary of overall business health",
+    "top_problems": [
+        {
+            "rank": 1-5,
+            "problem": "Clear problem statement",
+            "category": "sales|warehouse|finance|crm|operations|general",
+            "root_cause": "Detailed explanation of why this is happening",
+            "financial_impact": "Estimated monthly/quarterly impact in currency",
+            "recommended_action": "Specific, actionable step",
+            "action_priority": "critical|high|medium|low",
+            "estimated_effort": "hours|days|weeks",
+            "expected_roi": "percentage or currency estimate"
+        }
+    ],
+    "quick_wins": [
+        {
+            "action": "Quick action description",
+            "impact": "expected outcome",
+            "effort": "low"
+        }
+    ],
+    "strategic_initiatives": [
+        {
+            "initiative": "Long-term initiative name",
+            "description": "Description",
+            "timeline": "1-3 months|3-6 months|6-12 months",
+            "expected_impact": "Description"
+        }
+    ]
+}"""
+
+
+def run_stages(stages, completed=None, on_stage_complete=None):
+    """
+    Run the analysis stages in STAGES order; shared by every analyzer.
+
+    ``stages`` maps each stage to a callable that receives the outputs so far
+    and returns the stage output. Stages already present in ``completed`` are
+    reused, and ``on_stage_complete(stage, output)`` is called as soon as each
+    new stage finishes so callers can checkpoint partial results.
+    """
+    results = dict(completed or {})
+    for stage in STAGES:
+        if stage in results:
+            continue
+        with span(f'stage.{stage}'):
+            results[stage] = stages[stage](results)
+        if on_stage_complete:
+            on_stage_complete(stage, results[stage])
+    return results
+
+
+def severity_thresholds_prompt():
+    """Render SEVERITY_THRESHOLDS as the bullet list used in the prompt."""
+    lines = []
+    for ratio, (direction, high, medium) in SEVERITY_THRESHOLDS.items():
+        op = '>' if direction == 'above' else '<'
+        label = ratio.replace('_', ' ').capitalize()
+        lines.append(f"- {label} {op} {high}% = high, {op} {medium}% = medium")
+    return '\n'.join(lines)
+
+
+DATA_QUALITY_FORMAT = """Respond ONLY with a valid JSON object in this exact format:
+{
+    "red_flags": [
+        {
+            "severity": "high|medium|low",
+            "category": "sales|warehouse|finance|crm|operations|general",
+            "metric": "metric name",
+            "value": numeric_value,
+            "threshold": benchmark_value,
+            "description": "Clear explanation of the issue"
+        }
+    ],
+    "key_insights": [
+        {
+            "category": "sales|warehouse|finance|crm|operations|general",
+            "title": "Brief insight title",
+            "description": "Detailed insight description",
+            "impact": "high|medium|low"
+        }
+    ],
+    "data_quality_score": 0-100,
+    "summary": "Brief overall assessment"
+}
+
+Severity thresholds:
+""" + severity_thresholds_prompt()
+
+
 class AIAnalyzer:
     """Service for analyzing ERP data using Cerebras LLM."""
     
@@ -18,6 +125,22 @@ class AIAnalyzer:
         if isinstance(erp_data, dict):
             return erp_data
         return {"raw_data": erp_data}
+
+    def _prompt_data(self, erp_data, profile=None):
+        """Normalized ERP data with large profiled tables replaced by placeholders."""
+        normalized_data = self._normalize_erp_data(erp_data)
+        if profile and profile.get('tables'):
+            normalized_data = self._normalize_erp_data(compact_raw_data(erp_data, profile))
+        return normalized_data
+
+    def _profile_prompt(self, profile):
+        """Prompt section describing detected tables, or an empty string."""
+        if not profile or not profile.get('tables'):
+            return ""
+        return f"""
+
+Statistical Profile of Tables (computed locally over every row):
+{json.dumps(profile['tables'], indent=2)}"""
     
     def _calculate_ratios(self, erp_data):
         """Pre-calculate key business ratios from ERP data."""
@@ -66,15 +189,25 @@ class AIAnalyzer:
         try:
             logger.info("Calling Cerebras API...")
             
-            response = self.client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                model=self.model,
-                temperature=temperature,
-                stream=False
-            )
+            with span('llm.request', model=self.model,
+                      prompt_chars=len(system_prompt) + len(user_prompt)) as request_span:
+                response = self.client.chat.completions.create(
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    model=self.model,
+                    temperature=temperature,
+                    stream=False
+                )
+                usage = getattr(response, 'usage', None)
+                tokens = {
+                    key: getattr(usage, key, None)
+                    for key in ('prompt_tokens', 'completion_tokens', 'total_tokens')
+                }
+                request_span.set(**{key: value for key, value in tokens.items() if value is not None})
+            # Roll token usage up into the enclosing stage span.
+            current_span().add(**tokens)
             
             logger.info(f"Response type: {type(response)}")
             logger.info(f"Response: {response}")
@@ -91,131 +224,143 @@ class AIAnalyzer:
                 raise ValueError("Empty response from Cerebras API")
             
             # Try to parse as JSON
-            try:
-                return json.loads(content)
-            except json.JSONDecodeError as e:
-                logger.error(f"JSON decode error: {e}")
-                logger.error(f"Content: {content}")
-                # Try to extract JSON if wrapped in markdown code blocks
-                if '```json' in content:
-                    json_str = content.split('```json')[1].split('```')[0].strip()
-                    return json.loads(json_str)
-                elif '```' in content:
-                    json_str = content.split('```')[1].split('```')[0].strip()
-                    return json.loads(json_str)
-                raise
+            with span('json.parse', chars=len(content)):
+                try:
+                    return json.loads(content)
+                except json.JSONDecodeError as e:
+                    logger.error(f"JSON decode error: {e}")
+                    logger.error(f"Content: {content}")
+                    # Try to extract JSON if wrapped in markdown code blocks
+                    if '```json' in content:
+                        json_str = content.split('```json')[1].split('```')[0].strip()
+                        return json.loads(json_str)
+                    elif '```' in content:
+                        json_str = content.split('```')[1].split('```')[0].strip()
+                        return json.loads(json_str)
+                    raise
                 
         except Exception as e:
             logger.error(f"Error calling LLM: {e}")
             raise
     
-    def analyze_data_quality(self, erp_data):
+    def analyze_data_quality(self, erp_data, profile=None):
         """
         Analyze data quality and detect abnormal ratios.
         Returns structured JSON with red flags and insights.
         """
-        normalized_data = self._normalize_erp_data(erp_data)
-        ratios = self._calculate_ratios(normalized_data)
-        
-        system_prompt = """You are an expert ERP data analyst. Analyze the provided ERP data and ratios to identify data quality issues, anomalies, and business red flags. The data may be provided in standard ERP modules or in arbitrary metric tables; make reasonable inferences and note assumptions.
+        with span('prompt.build'):
+            normalized_data = self._prompt_data(erp_data, profile)
+            ratios = self._calculate_ratios(normalized_data)
 
-Respond ONLY with a valid JSON object in this exact format:
-{
-    "red_flags": [
-        {
-            "severity": "high|medium|low",
-            "category": "sales|warehouse|finance|crm|operations|general",
-            "metric": "metric name",
-            "value": numeric_value,
-            "threshold": benchmark_value,
-            "description": "Clear explanation of the issue"
-        }
-    ],
-    "key_insights": [
-        {
-            "category": "sales|warehouse|finance|crm|operations|general",
-            "title": "Brief insight title",
-            "description": "Detailed insight description",
-            "impact": "high|medium|low"
-        }
-    ],
-    "data_quality_score": 0-100,
-    "summary": "Brief overall assessment"
-}
+            system_prompt = """You are an expert ERP data analyst. Analyze the provided ERP data and ratios to identify data quality issues, anomalies, and business red flags. The data may be provided in standard ERP modules or in arbitrary metric tables; make reasonable inferences and note assumptions.
 
-Severity thresholds:
-- Cancellation rate > 15% = high, > 10% = medium
-- Stockout rate > 10% = high, > 5% = medium
-- Dead stock rate > 20% = high, > 15% = medium
-- Net profit margin < 5% = high, < 10% = medium
-- Conversion rate < 15% = high, < 20% = medium"""
-        
-        user_prompt = f"""Analyze this ERP data and pre-calculated ratios:
+""" + DATA_QUALITY_FORMAT
+
+            user_prompt = f"""Analyze this ERP data and pre-calculated ratios:
 
 Raw Data:
 {json.dumps(normalized_data, indent=2)}
 
 Calculated Ratios:
-{json.dumps(ratios, indent=2)}
+{json.dumps(ratios, indent=2)}{self._profile_prompt(profile)}
 
 Provide your analysis as JSON."""
         
         return self._call_llm(system_prompt, user_prompt)
     
-    def generate_business_strategy(self, erp_data, cleaning_insights):
+    def generate_business_strategy(self, erp_data, cleaning_insights, profile=None):
         """
         Generate business strategy based on data analysis.
         Returns top 5 problems with root causes and actions.
         """
-        normalized_data = self._normalize_erp_data(erp_data)
+        with span('prompt.build'):
+            normalized_data = self._prompt_data(erp_data, profile)
 
-        system_prompt = """You are a senior business strategist. Based on the ERP data and data quality insights, identify the top 5 business problems, their root causes, and recommended actions. The ERP data may be a generic metric table; infer business context as needed and state assumptions.
+            system_prompt = """You are a senior business strategist. Based on the ERP data and data quality insights, identify the top 5 business problems, their root causes, and recommended actions. The ERP data may be a generic metric table; infer business context as needed and state assumptions.
 
-Respond ONLY with a valid JSON object in this exact format:
-{
-    "executive_summary": "2-3 sentence summary of overall business health",
-    "top_problems": [
-        {
-            "rank": 1-5,
-            "problem": "Clear problem statement",
-            "category": "sales|warehouse|finance|crm|operations|general",
-            "root_cause": "Detailed explanation of why this is happening",
-            "financial_impact": "Estimated monthly/quarterly impact in currency",
-            "recommended_action": "Specific, actionable step",
-            "action_priority": "critical|high|medium|low",
-            "estimated_effort": "hours|days|weeks",
-            "expected_roi": "percentage or currency estimate"
-        }
-    ],
-    "quick_wins": [
-        {
-            "action": "Quick action description",
-            "impact": "expected outcome",
-            "effort": "low"
-        }
-    ],
-    "strategic_initiatives": [
-        {
-            "initiative": "Long-term initiative name",
-            "description": "Description",
-            "timeline": "1-3 months|3-6 months|6-12 months",
-            "expected_impact": "Description"
-        }
-    ]
-}"""
-        
-        user_prompt = f"""Generate business strategy based on:
+""" + BUSINESS_STRATEGY_FORMAT
+
+            user_prompt = f"""Generate business strategy based on:
 
 ERP Data:
 {json.dumps(normalized_data, indent=2)}
 
 Data Quality Insights:
-{json.dumps(cleaning_insights, indent=2)}
+{json.dumps(cleaning_insights, indent=2)}{self._profile_prompt(profile)}
 
 Provide your strategy as JSON."""
         
         return self._call_llm(system_prompt, user_prompt, temperature=0.4)
     
+    def update_data_quality(self, delta, changed_ratios, previous_findings, categories):
+        """
+        Re-assess only the categories touched by a metric-level delta.
+        Returns the data quality JSON format restricted to ``categories``.
+        """
+        system_prompt = f"""You are an expert ERP data analyst updating a previous analysis. Only the metrics listed as changed differ from the previously analyzed period. Re-assess data quality issues, anomalies, and business red flags for the affected categories ({', '.join(categories)}) only; findings for other categories are kept as they were. Return the complete, updated set of red flags and key insights for the affected categories, dropping previous findings the changes resolved.
+
+""" + DATA_QUALITY_FORMAT
+
+        user_prompt = f"""Update the analysis for these changes:
+
+Changed Metrics:
+{json.dumps(delta, indent=2)}
+
+Changed Ratios:
+{json.dumps(changed_ratios, indent=2)}
+
+Previous Findings for the Affected Categories:
+{json.dumps(previous_findings, indent=2)}
+
+Provide your analysis as JSON."""
+
+        return self._call_llm(system_prompt, user_prompt)
+
+    def update_business_strategy(self, previous_strategy, delta, cleaning_changes):
+        """
+        Revise a previous strategy for a small metric-level change.
+        Returns the full business strategy JSON format.
+        """
+        system_prompt = """You are a senior business strategist updating a previous strategy. Only the listed metrics changed since it was written. Keep what is still valid, and re-rank, revise, add or remove problems and actions as the changes and the updated data quality findings require.
+
+""" + BUSINESS_STRATEGY_FORMAT
+
+        user_prompt = f"""Update this business strategy:
+
+Previous Strategy:
+{json.dumps(previous_strategy, indent=2)}
+
+Changed Metrics:
+{json.dumps(delta, indent=2)}
+
+Updated Data Quality Findings:
+{json.dumps(cleaning_changes, indent=2)}
+
+Provide your strategy as JSON."""
+
+        return self._call_llm(system_prompt, user_prompt, temperature=0.4)
+
+    def generate_portfolio_strategy(self, unit_summaries, aggregated_ratios):
+        """
+        Generate one consolidated strategy for a group of business units.
+        Works only from compact per-unit results, never from raw unit data.
+        """
+        system_prompt = """You are a senior business strategist for a group of companies. Based on the per-unit data quality results and the group-level ratios, identify the top 5 problems for the group as a whole, their root causes, and recommended actions. Prefer problems that recur across units or dominate the group totals, and name the affected units in each problem statement.
+
+""" + BUSINESS_STRATEGY_FORMAT
+
+        user_prompt = f"""Generate a consolidated business strategy based on:
+
+Per-Unit Results:
+{json.dumps(unit_summaries, indent=2)}
+
+Group Ratios (computed from summed unit totals):
+{json.dumps(aggregated_ratios, indent=2)}
+
+Provide your strategy as JSON."""
+
+        return self._call_llm(system_prompt, user_prompt, temperature=0.4)
+
     def generate_erp_config(self, business_strategy):
         """
         Generate specific Bito ERP module configuration changes.
@@ -291,19 +436,33 @@ Provide configuration as JSON."""
         
         return self._call_llm(system_prompt, user_prompt, temperature=0.3)
     
-    def run_full_analysis(self, erp_data):
-        """Run the complete AI analysis chain."""
-        logger.info("Starting data quality analysis...")
-        cleaning_analysis = self.analyze_data_quality(erp_data)
+    def run_full_analysis(self, erp_data, completed=None, on_stage_complete=None, profile=None):
+        """
+        Run the complete AI analysis chain.
 
-        logger.info("Generating business strategy...")
-        business_strategy = self.generate_business_strategy(erp_data, cleaning_analysis)
+        Stages already present in ``completed`` are reused instead of being
+        re-generated. ``on_stage_complete(stage, output)`` is called as soon as
+        each new stage finishes so callers can checkpoint partial results.
+        ``profile`` is the statistical profile of any tables in ``erp_data``.
+        """
+        def cleaning_analysis(results):
+            logger.info("Starting data quality analysis...")
+            return self.analyze_data_quality(erp_data, profile)
 
-        logger.info("Generating ERP configuration...")
-        erp_actions = self.generate_erp_config(business_strategy)
+        def business_strategy(results):
+            logger.info("Generating business strategy...")
+            return self.generate_business_strategy(erp_data, results['cleaning_analysis'], profile)
 
-        return {
-            'cleaning_analysis': cleaning_analysis,
-            'business_strategy': business_strategy,
-            'erp_actions': erp_actions
-        }
+        def erp_actions(results):
+            logger.info("Generating ERP configuration...")
+            return self.generate_erp_config(results['business_strategy'])
+
+        return run_stages(
+            {
+                'cleaning_analysis': cleaning_analysis,
+                'business_strategy': business_strategy,
+                'erp_actions': erp_actions,
+            },
+            completed,
+            on_stage_complete
+        )
@@ -0,0 +1,200 @@
+import logging
+
+from ..models import ErpSnapshot
+from .ai_analyzer import STAGES, run_stages
+from .tracing import current_span
+
+logger = logging.getLogger(__name__)
+
+STANDARD_MODULES = ('sales', 'warehouse', 'finance', 'crm')
+CROSS_MODULE_CATEGORIES = ('operations', 'general')
+ALL_CATEGORIES = STANDARD_MODULES + CROSS_MODULE_CATEGORIES
+# Above this share of changed metrics a full re-analysis is cheaper to reason about.
+MAX_CHANGED_SHARE = 0.5
+
+
+def flatten(data, prefix=''):
+    """Flatten nested dicts and lists to {"a.b.0.c": scalar} metric paths."""
+    if isinstance(data, dict):
+        items = data.items()
+    elif isinstance(data, list):
+        items = enumerate(data)
+    else:
+        return {prefix: data}
+
+    flat = {}
+    for key, value in items:
+        path = f"{prefix}.{key}" if prefix else str(key)
+        flat.update(flatten(value, path))
+    if not flat and prefix:
+        # Keep empty containers visible so adding data to them shows up as a change.
+        flat[prefix] = data
+    return flat
+
+
+def diff_erp_data(old, new):
+    """
+    Metric-level diff between two raw_data payloads.
+
+    Small diffs keep every changed path and are marked ``incremental``; when
+    more than MAX_CHANGED_SHARE of the metrics differ only the counts are kept.
+    """
+    old_flat, new_flat = flatten(old), flatten(new)
+    changed = {
+        path: {'from': old_flat[path], 'to': value}
+        for path, value in new_flat.items()
+        if path in old_flat and old_flat[path] != value
+    }
+    added = {path: value for path, value in new_flat.items() if path not in old_flat}
+    removed = sorted(path for path in old_flat if path not in new_flat)
+
+    change_count = len(changed) + len(added) + len(removed)
+    total = max(len(new_flat), len(old_flat), 1)
+    if change_count > MAX_CHANGED_SHARE * total:
+        return {'change_count': change_count, 'total_metrics': total, 'incremental': False}
+    return {
+        'changed': changed,
+        'added': added,
+        'removed': removed,
+        'change_count': change_count,
+        'total_metrics': total,
+        'incremental': True,
+    }
+
+
+def affected_categories(delta):
+    """
+    Red flag categories a delta can affect; unknown paths affect everything.
+
+    Operations and general findings are drawn from metrics across modules,
+    so any change affects them too.
+    """
+    categories = set()
+    paths = list(delta.get('changed', {})) + list(delta.get('added', {})) + delta.get('removed', [])
+    for path in paths:
+        module = path.split('.', 1)[0]
+        if module not in STANDARD_MODULES:
+            return list(ALL_CATEGORIES)
+        categories.add(module)
+    if categories:
+        categories.update(CROSS_MODULE_CATEGORIES)
+    return sorted(categories)
+
+
+def find_previous_snapshot(series):
+    """Latest snapshot in a series whose analysis completed, if any."""
+    return (
+        ErpSnapshot.objects.filter(series=series, analysis__status='completed')
+        .order_by('-created_at')
+        .first()
+    )
+
+
+def _metric_changes(delta):
+    return {key: delta[key] for key in ('changed', 'added', 'removed') if delta.get(key)}
+
+
+class IncrementalAnalyzer:
+    """
+    Updates a previous analysis for a small change instead of starting over.
+
+    Red flags and insights for categories the delta cannot affect are reused
+    as is; the LLM only sees the changed metrics, the affected previous
+    findings and the previous strategy. Same contract as
+    AIAnalyzer.run_full_analysis.
+    """
+
+    def __init__(self, analyzer, base_analysis, delta):
+        self.analyzer = analyzer
+        self.base = base_analysis
+        self.delta = delta
+
+    def _changed_ratios(self, erp_data):
+        old = self.analyzer._calculate_ratios(
+            self.analyzer._normalize_erp_data(self.base.erp_snapshot.raw_data)
+        )
+        new = self.analyzer._calculate_ratios(self.analyzer._normalize_erp_data(erp_data))
+        return {
+            ratio: {'from': old.get(ratio), 'to': value}
+            for ratio, value in new.items()
+            if old.get(ratio) != value
+        }
+
+    def _update_cleaning(self, erp_data, categories):
+        previous = self.base.cleaning_analysis
+
+        def split(items):
+            items = [item for item in items or [] if isinstance(item, dict)]
+            kept = [item for item in items if item.get('category') not in categories]
+            affected = [item for item in items if item.get('category') in categories]
+            return kept, affected
+
+        kept_flags, affected_flags = split(previous.get('red_flags'))
+        kept_insights, affected_insights = split(previous.get('key_insights'))
+
+        update = self.analyzer.update_data_quality(
+            _metric_changes(self.delta),
+            self._changed_ratios(erp_data),
+            {'red_flags': affected_flags, 'key_insights': affected_insights},
+            categories
+        )
+        # Findings outside the affected categories would duplicate the reused ones.
+        _, updated_flags = split(update.get('red_flags'))
+        _, updated_insights = split(update.get('key_insights'))
+        return {
+            'red_flags': kept_flags + updated_flags,
+            'key_insights': kept_insights + updated_insights,
+            'data_quality_score': update.get('data_quality_score', previous.get('data_quality_score')),
+            'summary': update.get('summary', previous.get('summary')),
+            'incremental': {
+                'base_analysis_id': self.base.id,
+                'affected_categories': categories,
+                'reused_red_flags': len(kept_flags),
+                'reused_key_insights': len(kept_insights),
+            },
+        }
+
+    def run_full_analysis(self, erp_data, completed=None, on_stage_complete=None, profile=None):
+        if not self.delta.get('change_count'):
+            logger.info(f"No metric changes since analysis {self.base.id}; reusing its results")
+            return run_stages(
+                {stage: lambda results, stage=stage: getattr(self.base, stage) for stage in STAGES},
+                completed,
+                on_stage_complete
+            )
+
+        categories = affected_categories(self.delta)
+
+        def cleaning_analysis(results):
+            logger.info(f"Updating data quality analysis for {', '.join(categories)}...")
+            current_span().set(categories=','.join(categories))
+            return self._update_cleaning(erp_data, categories)
+
+        def business_strategy(results):
+            logger.info("Updating business strategy...")
+            cleaning = results['cleaning_analysis']
+            cleaning_changes = {
+                key: [
+                    item for item in cleaning.get(key) or []
+                    if isinstance(item, dict) and item.get('category') in categories
+                ]
+                for key in ('red_flags', 'key_insights')
+            }
+            cleaning_changes['data_quality_score'] = cleaning.get('data_quality_score')
+            return self.analyzer.update_business_strategy(
+                self.base.business_strategy, _metric_changes(self.delta), cleaning_changes
+            )
+
+        def erp_actions(results):
+            logger.info("Generating ERP configuration...")
+            return self.analyzer.generate_erp_config(results['business_strategy'])
+
+        return run_stages(
+            {
+                'cleaning_analysis': cleaning_analysis,
+                'business_strategy': business_strategy,
+                'erp_actions': erp_actions,
+            },
+            completed,
+            on_stage_complete
+        )
@@ -0,0 +1,97 @@
+import logging
+
+from django.db import transaction
+
+from ..models import RedFlag, Problem
+
+logger = logging.getLogger(__name__)
+
+
+def to_float(value):
+    """Coerce numbers like 12, "12.5%", "$1,200" or " 35 " to float; None otherwise."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        cleaned = value.replace('%', '').replace(',', '').replace('$', '').strip()
+        try:
+            return float(cleaned)
+        except ValueError:
+            return None
+    return None
+
+
+def _to_int(value):
+    number = to_float(value)
+    return int(number) if number is not None else None
+
+
+def _text(value, max_length=None):
+    text = '' if value is None else str(value).strip()
+    return text[:max_length] if max_length else text
+
+
+def build_findings(analysis):
+    """Build unsaved RedFlag and Problem rows from an analysis' JSON outputs."""
+    cleaning = analysis.cleaning_analysis if isinstance(analysis.cleaning_analysis, dict) else {}
+    strategy = analysis.business_strategy if isinstance(analysis.business_strategy, dict) else {}
+
+    red_flags = [
+        RedFlag(
+            analysis_id=analysis.id,
+            severity=_text(flag.get('severity'), 20).lower() or 'unknown',
+            category=_text(flag.get('category'), 50).lower() or 'general',
+            metric=_text(flag.get('metric'), 255),
+            value=to_float(flag.get('value')),
+            threshold=to_float(flag.get('threshold')),
+            description=_text(flag.get('description')),
+            created_at=analysis.created_at,
+        )
+        for flag in cleaning.get('red_flags') or []
+        if isinstance(flag, dict)
+    ]
+    problems = [
+        Problem(
+            analysis_id=analysis.id,
+            rank=_to_int(item.get('rank')),
+            problem=_text(item.get('problem')),
+            category=_text(item.get('category'), 50).lower() or 'general',
+            action_priority=_text(item.get('action_priority'), 20).lower(),
+            root_cause=_text(item.get('root_cause')),
+            recommended_action=_text(item.get('recommended_action')),
+            financial_impact=_text(item.get('financial_impact')),
+            created_at=analysis.created_at,
+        )
+        for item in strategy.get('top_problems') or []
+        if isinstance(item, dict)
+    ]
+    return red_flags, problems
+
+
+def sync_findings(analysis):
+    """Replace the normalized red flags and problems of a single analysis."""
+    red_flags, problems = build_findings(analysis)
+    with transaction.atomic():
+        RedFlag.objects.filter(analysis_id=analysis.id).delete()
+        Problem.objects.filter(analysis_id=analysis.id).delete()
+        RedFlag.objects.bulk_create(red_flags)
+        Problem.objects.bulk_create(problems)
+    return len(red_flags), len(problems)
+
+
+def sync_findings_batch(analyses):
+    """Replace findings for a batch of analyses with one delete and insert per table."""
+    red_flags, problems = [], []
+    for analysis in analyses:
+        flags, items = build_findings(analysis)
+        red_flags.extend(flags)
+        problems.extend(items)
+
+    analysis_ids = [analysis.id for analysis in analyses]
+    with transaction.atomic():
+        RedFlag.objects.filter(analysis_id__in=analysis_ids).delete()
+        Problem.objects.filter(analysis_id__in=analysis_ids).delete()
+        RedFlag.objects.bulk_create(red_flags, batch_size=1000)
+        Problem.objects.bulk_create(problems, batch_size=1000)
+    return len(red_flags), len(problems)
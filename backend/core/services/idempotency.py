@@ -0,0 +1,67 @@
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from ..models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 255
+
+
+def request_fingerprint(data):
+    """Stable SHA-256 of a request body, independent of key order."""
+    payload = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def claim_key(key, fingerprint):
+    """
+    Atomically claim an idempotency key.
+
+    Returns ``(record, created)``. ``created`` is False when another request
+    already holds the key; the unique constraint on ``key`` guarantees only one
+    concurrent caller can win. Expired records are replaced.
+    """
+    expires_at = timezone.now() + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    key=key, request_hash=fingerprint, expires_at=expires_at
+                )
+            return record, True
+        except IntegrityError:
+            try:
+                record = IdempotencyKey.objects.select_related('analysis').get(key=key)
+            except IdempotencyKey.DoesNotExist:
+                # Released between our insert and lookup; try again.
+                continue
+            if record.expires_at > timezone.now():
+                return record, False
+            IdempotencyKey.objects.filter(id=record.id, expires_at__lte=timezone.now()).delete()
+    raise RuntimeError(f"Could not claim idempotency key {key}")
+
+
+def release_key(record):
+    """Forget a key whose request failed before an analysis was attached."""
+    IdempotencyKey.objects.filter(id=record.id, analysis__isnull=True).delete()
+
+
+def purge_expired_keys(batch_size=1000, now=None):
+    """Delete expired keys in batches and return how many were removed."""
+    now = now or timezone.now()
+    deleted = 0
+    while True:
+        ids = list(
+            IdempotencyKey.objects.filter(expires_at__lte=now)
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,157 @@
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from ..models import AnalysisResult
+from .ai_analyzer import AIAnalyzer, STAGES
+from .delta import IncrementalAnalyzer
+from .findings import sync_findings
+from .portfolio import PortfolioAnalyzer
+from .profiler import profile_raw_data
+from .tracing import append_run, export_otlp, span, to_otlp, trace
+
+logger = logging.getLogger(__name__)
+
+
+# Rows in these states are not being worked on and may be claimed by a new run.
+CLAIMABLE_STATUSES = ('pending', 'failed')
+
+
+class AnalysisClaimError(Exception):
+    """Raised when another run changed the analysis before this one could claim it."""
+
+
+def is_stale(analysis, now=None):
+    """Pending or processing for longer than STALE_ANALYSIS_MINUTES, e.g. after a crash."""
+    cutoff = (now or timezone.now()) - timedelta(minutes=settings.STALE_ANALYSIS_MINUTES)
+    return analysis.status in ('pending', 'processing') and analysis.updated_at < cutoff
+
+
+def claim_analysis(analysis, **changes):
+    """
+    Compare-and-set on status and updated_at: apply ``changes`` only if the row
+    is unchanged since ``analysis`` was loaded. Returns True when this caller
+    won the row. Uses update(), so no save signals are sent.
+    """
+    now = timezone.now()
+    claimed = AnalysisResult.objects.filter(
+        id=analysis.id, status=analysis.status, updated_at=analysis.updated_at
+    ).update(updated_at=now, **changes)
+    if claimed != 1:
+        return False
+    for field, value in changes.items():
+        setattr(analysis, field, value)
+    analysis.updated_at = now
+    return True
+
+
+def run_analysis(analysis, analyzer=None):
+    """
+    Run (or resume) the analysis chain for an AnalysisResult.
+
+    Each stage output is saved as soon as it is produced, so a failure in a
+    later stage keeps the earlier results and a retry only re-runs the stages
+    that are still missing. Every run records a span tree in ``analysis.trace``.
+
+    Only pending, failed or stale processing analyses are claimed. Raises
+    AnalysisClaimError, without touching the row, if the analysis is being
+    run elsewhere or another run changed it since it was loaded.
+    """
+    with trace('run_analysis', analysis_id=analysis.id) as run_span:
+        if analysis.status == 'pending':
+            # Pending analyses were last saved when they were created or queued.
+            run_span.set(
+                queue_wait_ms=round((timezone.now() - analysis.updated_at).total_seconds() * 1000, 2)
+            )
+        claimable = analysis.status in CLAIMABLE_STATUSES or is_stale(analysis)
+        with span('db.save', fields='status'):
+            claimed = claimable and claim_analysis(
+                analysis, status='processing', error_message=None
+            )
+        if not claimed:
+            raise AnalysisClaimError(f"Analysis {analysis.id} was claimed by another run")
+        try:
+            return _run_stages(analysis, analyzer, run_span)
+        finally:
+            _record_trace(analysis, run_span.trace)
+
+
+def _record_trace(analysis, active_trace):
+    run = active_trace.to_dict()
+    analysis.trace = append_run(analysis.trace, run)
+    try:
+        analysis.save(update_fields=['trace'])
+    except Exception as e:
+        logger.error(f"Error saving trace for analysis {analysis.id}: {e}")
+
+    endpoint = settings.OTEL_EXPORTER_OTLP_ENDPOINT
+    if endpoint:
+        # Exported off the request thread; a slow collector must not delay the response.
+        payload = to_otlp(run, {'analysis.id': analysis.id})
+        threading.Thread(target=export_otlp, args=(payload, endpoint), daemon=True).start()
+
+
+def _run_stages(analysis, analyzer, run_span):
+    run_span.set(resumed_stages=len(analysis.completed_stages()))
+
+    def checkpoint(stage, output):
+        setattr(analysis, stage, output)
+        analysis.stage_status[stage] = 'completed'
+        with span('db.save', stage=stage):
+            analysis.save(update_fields=[stage, 'stage_status', 'updated_at'])
+        logger.info(f"Analysis {analysis.id}: stage {stage} saved")
+
+    try:
+        snapshot = analysis.erp_snapshot
+        portfolio = snapshot.kind == 'portfolio'
+        if not snapshot.profile and not portfolio:
+            with span('profile'):
+                snapshot.profile = profile_raw_data(snapshot.raw_data)
+            with span('db.save', fields='profile'):
+                snapshot.save(update_fields=['profile', 'updated_at'])
+
+        analyzer = analyzer or AIAnalyzer()
+        if portfolio:
+            # Units are profiled individually in the map stage.
+            analyzer = PortfolioAnalyzer(analyzer)
+        elif snapshot.delta.get('incremental') and snapshot.previous_id:
+            base_analysis = (
+                AnalysisResult.objects.select_related('erp_snapshot')
+                .filter(erp_snapshot_id=snapshot.previous_id, status='completed')
+                .first()
+            )
+            if base_analysis:
+                analyzer = IncrementalAnalyzer(analyzer, base_analysis, snapshot.delta)
+        run_span.set(analyzer=type(analyzer).__name__)
+        analyzer.run_full_analysis(
+            snapshot.raw_data,
+            completed=analysis.completed_stages(),
+            on_stage_complete=checkpoint,
+            profile=snapshot.profile
+        )
+    except Exception as e:
+        failed_stage = next(
+            (stage for stage in STAGES if analysis.stage_status.get(stage) != 'completed'),
+            None
+        )
+        if failed_stage:
+            analysis.stage_status[failed_stage] = 'failed'
+        analysis.status = 'failed'
+        analysis.error_message = str(e)
+        analysis.save(update_fields=['status', 'error_message', 'stage_status', 'updated_at'])
+        raise
+
+    analysis.status = 'completed'
+    with span('db.save', fields='status'):
+        analysis.save(update_fields=['status', 'updated_at'])
+
+    try:
+        with span('findings.sync'):
+            sync_findings(analysis)
+    except Exception as e:
+        # Findings can be rebuilt with the backfill_findings command.
+        logger.error(f"Error extracting findings for analysis {analysis.id}: {e}")
+    return analysis
@@ -0,0 +1,228 @@
+import contextvars
+import hashlib
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from ..models import PortfolioUnitResult
+from .ai_analyzer import AIAnalyzer, run_stages
+from .profiler import profile_raw_data
+from .tracing import current_span, span
+
+logger = logging.getLogger(__name__)
+
+MODULES = ('sales', 'warehouse', 'finance', 'crm')
+# Per-unit averages and rates; summing them across units is meaningless.
+NON_ADDITIVE_FIELDS = {('sales', 'aov'), ('sales', 'repeat')}
+
+
+def _data_hash(data, model):
+    payload = json.dumps({'model': model, 'data': data}, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _summarize_unit(name, ratios, cleaning_analysis):
+    """Keep only what the reduce stage needs from a unit's data quality result."""
+    return {
+        'unit': name,
+        'ratios': ratios,
+        'data_quality_score': cleaning_analysis.get('data_quality_score'),
+        'summary': cleaning_analysis.get('summary'),
+        'red_flags': [
+            {
+                key: flag.get(key)
+                for key in ('severity', 'category', 'metric', 'value', 'threshold')
+            }
+            for flag in cleaning_analysis.get('red_flags') or []
+            if isinstance(flag, dict)
+        ],
+        'key_insights': [
+            insight.get('title')
+            for insight in cleaning_analysis.get('key_insights') or []
+            if isinstance(insight, dict)
+        ],
+    }
+
+
+def _merge_unit_items(unit_results, key):
+    """Concatenate a list from every unit's cleaning analysis, tagging each item with its unit."""
+    return [
+        {**item, 'unit': unit['name']}
+        for unit in unit_results
+        for item in unit['cleaning_analysis'].get(key) or []
+        if isinstance(item, dict)
+    ]
+
+
+def _consolidate_quality(unit_results):
+    """Group data quality score (mean of the unit scores, if any) and a summary naming the weakest unit."""
+    scores = [
+        (unit['name'], unit['cleaning_analysis'].get('data_quality_score'))
+        for unit in unit_results
+    ]
+    scores = [
+        (name, score) for name, score in scores
+        if isinstance(score, (int, float)) and not isinstance(score, bool)
+    ]
+    if not scores:
+        # Left out rather than null, so the dashboard shows it as pending.
+        return {
+            'summary': f"{len(unit_results)} business units analyzed; no unit reported a data quality score.",
+        }
+    weakest, lowest = min(scores, key=lambda item: item[1])
+    return {
+        'data_quality_score': round(sum(score for _, score in scores) / len(scores)),
+        'summary': (
+            f"{len(unit_results)} business units analyzed. "
+            f"Lowest data quality: {weakest} ({lowest}/100)."
+        ),
+    }
+
+
+class PortfolioAnalyzer:
+    """
+    Map-reduce analysis over several business units.
+
+    The map stage runs analyze_data_quality for each unit in parallel and caches
+    the result by content hash, so re-submitting a portfolio with one new unit
+    only analyzes that unit. The reduce stage sees compact per-unit summaries and
+    group ratios, never the raw unit data.
+    """
+
+    def __init__(self, analyzer=None, max_workers=None):
+        self.analyzer = analyzer or AIAnalyzer()
+        self.max_workers = max_workers or settings.PORTFOLIO_MAX_WORKERS
+
+    def aggregate_ratios(self, units):
+        """Group ratios from summed numeric module fields of all units."""
+        totals = {module: {} for module in MODULES}
+        repeat_rates = []
+        # (aov, total_orders) per unit, for an order-weighted group AOV.
+        aovs = []
+        for unit in units:
+            data = unit['raw_data']
+            if not isinstance(data, dict):
+                continue
+            for module in MODULES:
+                module_data = data.get(module)
+                if not isinstance(module_data, dict):
+                    continue
+                for field, value in module_data.items():
+                    if (module, field) in NON_ADDITIVE_FIELDS:
+                        continue
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        totals[module][field] = totals[module].get(field, 0) + value
+            if isinstance(data.get('sales'), dict):
+                unit_ratios = self.analyzer._calculate_ratios(data)
+                if 'repeat' in data['sales']:
+                    repeat_rates.append(unit_ratios['repeat_rate'])
+                if 'aov' in data['sales']:
+                    aovs.append((unit_ratios['aov'], data['sales'].get('total_orders') or 0))
+
+        if not any(totals.values()) and not aovs:
+            return {}
+        ratios = self.analyzer._calculate_ratios(totals)
+        # Repeat rate is a percentage, so average it instead of summing.
+        ratios['repeat_rate'] = sum(repeat_rates) / len(repeat_rates) if repeat_rates else 0
+        orders = sum(unit_orders for _, unit_orders in aovs)
+        if orders:
+            ratios['aov'] = sum(aov * unit_orders for aov, unit_orders in aovs) / orders
+        else:
+            ratios['aov'] = sum(aov for aov, _ in aovs) / len(aovs) if aovs else 0
+        return ratios
+
+    def map_units(self, units):
+        """Return the data quality result for every unit, using the cache where possible."""
+        hashes = [_data_hash(unit['raw_data'], self.analyzer.model) for unit in units]
+        cached = {
+            result.data_hash: result
+            for result in PortfolioUnitResult.objects.filter(data_hash__in=hashes)
+        }
+        missing = [
+            (data_hash, unit) for data_hash, unit in zip(hashes, units)
+            if data_hash not in cached
+        ]
+        logger.info(f"Portfolio map: {len(units) - len(missing)} cached, {len(missing)} to analyze")
+
+        if missing:
+            # Threads only make LLM calls; all DB access stays on this thread.
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                # Each task runs in a copy of this context so its spans join the trace.
+                futures = [
+                    (data_hash, executor.submit(contextvars.copy_context().run, self._analyze_unit, unit))
+                    for data_hash, unit in missing
+                ]
+            new_results, errors = [], []
+            for data_hash, future in futures:
+                try:
+                    ratios, cleaning = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                new_results.append(PortfolioUnitResult(
+                    data_hash=data_hash, ratios=ratios, cleaning_analysis=cleaning
+                ))
+            # Cache successful units even if others failed, so a retry skips them.
+            PortfolioUnitResult.objects.bulk_create(new_results, ignore_conflicts=True)
+            if errors:
+                raise errors[0]
+            cached.update({result.data_hash: result for result in new_results})
+
+        return [
+            {
+                'name': unit['name'],
+                'data_hash': data_hash,
+                'ratios': cached[data_hash].ratios,
+                'cleaning_analysis': cached[data_hash].cleaning_analysis,
+            }
+            for data_hash, unit in zip(hashes, units)
+        ]
+
+    def _analyze_unit(self, unit):
+        with span('portfolio.unit', unit=unit['name']):
+            data = unit['raw_data']
+            with span('profile'):
+                profile = profile_raw_data(data)
+            ratios = self.analyzer._calculate_ratios(self.analyzer._normalize_erp_data(data))
+            return ratios, self.analyzer.analyze_data_quality(data, profile)
+
+    def run_full_analysis(self, erp_data, completed=None, on_stage_complete=None, profile=None):
+        """Same contract as AIAnalyzer.run_full_analysis, for portfolio snapshots."""
+        units = erp_data['portfolio']
+
+        def cleaning_analysis(results):
+            current_span().set(units=len(units))
+            unit_results = self.map_units(units)
+            return {
+                'portfolio': True,
+                'group_ratios': self.aggregate_ratios(units),
+                'units': unit_results,
+                **_consolidate_quality(unit_results),
+                'red_flags': _merge_unit_items(unit_results, 'red_flags'),
+                'key_insights': _merge_unit_items(unit_results, 'key_insights'),
+            }
+
+        def business_strategy(results):
+            logger.info("Generating consolidated portfolio strategy...")
+            cleaning = results['cleaning_analysis']
+            unit_summaries = [
+                _summarize_unit(unit['name'], unit['ratios'], unit['cleaning_analysis'])
+                for unit in cleaning['units']
+            ]
+            return self.analyzer.generate_portfolio_strategy(unit_summaries, cleaning['group_ratios'])
+
+        def erp_actions(results):
+            logger.info("Generating ERP configuration...")
+            return self.analyzer.generate_erp_config(results['business_strategy'])
+
+        return run_stages(
+            {
+                'cleaning_analysis': cleaning_analysis,
+                'business_strategy': business_strategy,
+                'erp_actions': erp_actions,
+            },
+            completed,
+            on_stage_complete
+        )
@@ -0,0 +1,223 @@
+import json
+import logging
+import warnings
+
+import numpy as np
+
+from .findings import to_float
+
+logger = logging.getLogger(__name__)
+
+# Tables smaller than this are still sent to the LLM row by row.
+INLINE_ROW_LIMIT = 50
+MAX_TABLES = 20
+MAX_COLUMNS = 200
+MAX_CORRELATION_COLUMNS = 50
+MAX_SEARCH_DEPTH = 4
+NUMERIC_SHARE = 0.8
+ZSCORE_LIMIT = 3.0
+CORRELATION_LIMIT = 0.7
+QUANTILES = (5, 25, 50, 75, 95)
+SAMPLE_ROWS = 3
+
+
+def _is_null(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _round(value):
+    value = float(value)
+    return None if np.isnan(value) or np.isinf(value) else round(value, 4)
+
+
+def _is_scalar_list(value):
+    return isinstance(value, list) and not any(isinstance(item, (dict, list)) for item in value)
+
+
+def _as_records(value):
+    """Return (columns, rows) if value looks like a table, otherwise None."""
+    if isinstance(value, list) and len(value) >= 2:
+        if all(isinstance(row, dict) for row in value):
+            columns = []
+            for row in value:
+                for key in row:
+                    if key not in columns:
+                        columns.append(key)
+            return columns[:MAX_COLUMNS], [[row.get(col) for col in columns[:MAX_COLUMNS]] for row in value]
+        if all(isinstance(row, list) for row in value):
+            header = value[0]
+            if header and all(isinstance(cell, str) for cell in header) and len(value) >= 3:
+                columns = header[:MAX_COLUMNS]
+                rows = [
+                    [row[i] if i < len(row) else None for i in range(len(columns))]
+                    for row in value[1:]
+                ]
+                return columns, rows
+    if isinstance(value, dict) and value and all(_is_scalar_list(col) for col in value.values()):
+        lengths = {len(col) for col in value.values()}
+        if len(lengths) == 1 and lengths.pop() >= 2:
+            columns = list(value)[:MAX_COLUMNS]
+            return columns, [list(row) for row in zip(*(value[col] for col in columns))]
+    return None
+
+
+def find_tables(raw_data, path=(), depth=0):
+    """Yield (path, columns, rows) for every tabular structure inside raw_data."""
+    table = _as_records(raw_data)
+    if table:
+        yield (list(path),) + table
+        return
+    if isinstance(raw_data, dict) and depth < MAX_SEARCH_DEPTH:
+        for key, value in raw_data.items():
+            yield from find_tables(value, path + (key,), depth + 1)
+
+
+def _profile_numeric(columns, matrix):
+    """Compute per-column statistics for a (rows x columns) float matrix in one pass."""
+    present = ~np.isnan(matrix)
+    count = present.sum(axis=0)
+    rows = matrix.shape[0]
+
+    with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        minimum = np.nanmin(matrix, axis=0)
+        maximum = np.nanmax(matrix, axis=0)
+        mean = np.nanmean(matrix, axis=0)
+        std = np.nanstd(matrix, axis=0)
+        quantiles = np.nanpercentile(matrix, QUANTILES, axis=0)
+
+        zscores = np.abs((matrix - mean) / std)
+        zscore_outliers = np.nansum(zscores > ZSCORE_LIMIT, axis=0)
+
+        q1 = quantiles[QUANTILES.index(25)]
+        q3 = quantiles[QUANTILES.index(75)]
+        iqr = q3 - q1
+        iqr_outliers = ((matrix < q1 - 1.5 * iqr) | (matrix > q3 + 1.5 * iqr)).sum(axis=0)
+
+    stats = {}
+    for i, column in enumerate(columns):
+        stats[str(column)] = {
+            'count': int(count[i]),
+            'null_rate': _round(1 - count[i] / rows),
+            'min': _round(minimum[i]),
+            'max': _round(maximum[i]),
+            'mean': _round(mean[i]),
+            'std': _round(std[i]),
+            'quantiles': {f"p{q}": _round(quantiles[j][i]) for j, q in enumerate(QUANTILES)},
+            'zscore_outliers': int(zscore_outliers[i]),
+            'iqr_outliers': int(iqr_outliers[i]),
+        }
+    return stats, mean, std
+
+
+def _correlations(columns, matrix, mean):
+    """Pairwise-complete Pearson correlations, computed with two matrix products."""
+    columns = columns[:MAX_CORRELATION_COLUMNS]
+    matrix = matrix[:, :MAX_CORRELATION_COLUMNS]
+    if len(columns) < 2:
+        return []
+
+    present = (~np.isnan(matrix)).astype(float)
+    centered = np.nan_to_num(matrix - mean[:len(columns)])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        products = centered.T @ centered
+        squares = (centered ** 2).T @ present
+        corr = products / np.sqrt(squares * squares.T)
+
+    pairs = []
+    upper_i, upper_j = np.triu_indices(len(columns), k=1)
+    values = corr[upper_i, upper_j]
+    strong = np.where(np.abs(np.nan_to_num(values)) >= CORRELATION_LIMIT)[0]
+    for k in strong[np.argsort(-np.abs(values[strong]))][:10]:
+        pairs.append({
+            'columns': [str(columns[upper_i[k]]), str(columns[upper_j[k]])],
+            'r': _round(values[k]),
+        })
+    return pairs
+
+
+def profile_table(columns, rows):
+    """Profile one table: numeric stats, categorical summaries and correlations."""
+    numeric_columns, numeric_values, categorical = [], [], {}
+
+    for i, column in enumerate(columns):
+        values = [row[i] for row in rows]
+        non_null = [value for value in values if not _is_null(value)]
+        numbers = [to_float(value) for value in values]
+        parsed = sum(1 for value in numbers if value is not None)
+
+        if non_null and parsed >= NUMERIC_SHARE * len(non_null):
+            numeric_columns.append(column)
+            numeric_values.append([np.nan if value is None else value for value in numbers])
+            continue
+
+        distinct = {}
+        for value in non_null:
+            key = json.dumps(value, sort_keys=True, default=str) if isinstance(value, (dict, list)) else str(value)
+            distinct[key] = distinct.get(key, 0) + 1
+        top_values = sorted(distinct.items(), key=lambda item: -item[1])[:5]
+        categorical[str(column)] = {
+            'count': len(non_null),
+            'null_rate': _round(1 - len(non_null) / len(values)),
+            'distinct': len(distinct),
+            'top_values': [{'value': value, 'count': count} for value, count in top_values],
+        }
+
+    profile = {
+        'rows': len(rows),
+        'numeric': {},
+        'categorical': categorical,
+        'correlations': [],
+    }
+    if numeric_columns:
+        matrix = np.array(numeric_values, dtype=float).T
+        profile['numeric'], mean, _ = _profile_numeric(numeric_columns, matrix)
+        profile['correlations'] = _correlations(numeric_columns, matrix, mean)
+    return profile
+
+
+def profile_raw_data(raw_data):
+    """
+    Detect tables anywhere in raw_data and return a compact statistical profile.
+
+    The result always has a ``tables`` list (possibly empty) so callers can tell
+    a computed profile apart from one that was never generated.
+    """
+    tables = []
+    for path, columns, rows in find_tables(raw_data):
+        if len(tables) >= MAX_TABLES:
+            logger.info("Profiler: table limit reached, skipping the rest")
+            break
+        table_profile = profile_table(columns, rows)
+        table_profile['path'] = path
+        table_profile['sample'] = [
+            {str(col): row[i] for i, col in enumerate(columns)} for row in rows[:SAMPLE_ROWS]
+        ]
+        tables.append(table_profile)
+    return {'tables': tables}
+
+
+def compact_raw_data(raw_data, profile):
+    """
+    Replace large profiled tables in raw_data with a short placeholder.
+
+    Tables with at most INLINE_ROW_LIMIT rows are left as they are.
+    """
+    for table in (profile or {}).get('tables', []):
+        if table['rows'] <= INLINE_ROW_LIMIT:
+            continue
+        placeholder = f"<table with {table['rows']} rows; see statistical profile>"
+        path = table['path']
+        if not path:
+            return placeholder
+        raw_data = _replace_at(raw_data, path, placeholder)
+    return raw_data
+
+
+def _replace_at(data, path, replacement):
+    """Return a copy of nested dict ``data`` with the value at ``path`` replaced."""
+    if not isinstance(data, dict) or path[0] not in data:
+        return data
+    copy = dict(data)
+    copy[path[0]] = replacement if len(path) == 1 else _replace_at(data[path[0]], path[1:], replacement)
+    return copy
@@ -0,0 +1,84 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from ..models import AnalysisResult
+from .ai_analyzer import STAGES
+from .pipeline import AnalysisClaimError, claim_analysis, is_stale, run_analysis
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.REANALYSIS_MAX_WORKERS,
+                thread_name_prefix='reanalysis'
+            )
+        return _executor
+
+
+def needs_reanalysis(analysis, now=None):
+    return analysis.status == 'failed' or is_stale(analysis, now)
+
+
+def queue_reanalysis(analysis_ids, restart=False):
+    """
+    Queue failed or stale analyses on a bounded worker pool.
+
+    Without ``restart`` only the missing stages run again, like the resume
+    endpoint; with it all stage outputs are cleared first. Each row is claimed
+    with a compare-and-set back to ``pending``, so concurrent actions cannot
+    queue it twice, and it becomes stale again if the process dies before
+    running it. The worker claims the row against the ``updated_at`` written
+    here, so a resume that starts it in the meantime wins. Returns the queued ids.
+    """
+    now = timezone.now()
+    analyses = [
+        analysis
+        for analysis in AnalysisResult.objects.filter(id__in=analysis_ids).only(
+            'id', 'status', 'updated_at', 'stage_status'
+        )
+        if needs_reanalysis(analysis, now)
+    ]
+
+    changes = {'status': 'pending', 'error_message': None}
+    if restart:
+        changes.update({stage: {} for stage in STAGES}, stage_status={})
+
+    executor = _get_executor()
+    queued = []
+    for analysis in analyses:
+        if not claim_analysis(analysis, **changes):
+            continue
+        executor.submit(_reanalyze, analysis.id, analysis.updated_at)
+        queued.append(analysis.id)
+
+    logger.info(f"Queued {len(queued)} analyses for re-analysis (restart={restart})")
+    return queued
+
+
+def _reanalyze(analysis_id, queued_at):
+    try:
+        analysis = AnalysisResult.objects.select_related('erp_snapshot').get(id=analysis_id)
+        # Claim the row as queue_reanalysis left it, not as it is now.
+        analysis.status = 'pending'
+        analysis.updated_at = queued_at
+        run_analysis(analysis)
+    except AnalysisClaimError as e:
+        logger.info(f"Skipping re-analysis: {e}")
+    except Exception as e:
+        # run_analysis has already marked the analysis as failed.
+        logger.error(f"Re-analysis of analysis {analysis_id} failed: {e}")
+    finally:
+        # Worker threads outlive requests, so nothing else closes their connection.
+        connection.close()
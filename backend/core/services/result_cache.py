@@ -0,0 +1,15 @@
+from django.utils.http import quote_etag
+
+
+def cache_key(analysis_id):
+    """Rendered GET /api/results/<id>/ body of a completed analysis."""
+    return f"analysis-result:{analysis_id}"
+
+
+def etag(analysis_id, status, updated_at, snapshot_updated_at):
+    # Every write to either row bumps its updated_at; the body embeds both, so
+    # e.g. a profile saved after the analysis was claimed yields a new tag.
+    return quote_etag(
+        f"{analysis_id}-{status}-{int(updated_at.timestamp() * 1e6)}"
+        f"-{int(snapshot_updated_at.timestamp() * 1e6)}"
+    )
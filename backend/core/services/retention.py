@@ -0,0 +1,211 @@
+import gzip
+import json
+import logging
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+
+from ..models import ErpSnapshot, PortfolioUnitResult
+from .idempotency import purge_expired_keys
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PAYLOAD_FIELDS = ('raw_data', 'profile', 'delta')
+ANALYSIS_PAYLOAD_FIELDS = ('cleaning_analysis', 'business_strategy', 'erp_actions', 'trace')
+
+
+class RetentionEngine:
+    """
+    Deletes (optionally archiving first) expired snapshots and their analyses.
+
+    A snapshot expires when its analysis is older than the retention window for
+    its status, or when it has no analysis at all (orphaned) past a short grace
+    period. Expired idempotency keys and cached portfolio unit results are
+    removed as well. Rows are processed in small batches, each in its own
+    transaction, so the purge never holds long locks on the analysis tables.
+    """
+
+    def __init__(self, retention_days=None, failed_retention_days=None,
+                 batch_size=None, archive_dir=None, archive=True, dry_run=False):
+        # 0 is a valid window (purge everything), so only None means "use the setting".
+        self.retention_days = (
+            settings.ANALYSIS_RETENTION_DAYS if retention_days is None else retention_days
+        )
+        self.failed_retention_days = (
+            settings.FAILED_ANALYSIS_RETENTION_DAYS
+            if failed_retention_days is None else failed_retention_days
+        )
+        self.batch_size = batch_size or settings.RETENTION_BATCH_SIZE
+        self.archive_dir = archive_dir or settings.RETENTION_ARCHIVE_DIR
+        self.archive = archive
+        self.dry_run = dry_run
+        self.archive_path = None
+
+    def expired_querysets(self, now=None):
+        """Return the snapshot querysets to purge, keyed by reason."""
+        now = now or timezone.now()
+        orphan_cutoff = now - timedelta(hours=settings.ORPHAN_SNAPSHOT_GRACE_HOURS)
+        return {
+            'completed': ErpSnapshot.objects.filter(
+                analysis__status='completed',
+                analysis__created_at__lt=now - timedelta(days=self.retention_days)
+            ),
+            'failed': ErpSnapshot.objects.filter(
+                analysis__status='failed',
+                analysis__created_at__lt=now - timedelta(days=self.failed_retention_days)
+            ),
+            'orphaned': ErpSnapshot.objects.filter(
+                analysis__isnull=True,
+                created_at__lt=orphan_cutoff
+            ),
+        }
+
+    def run(self, now=None):
+        report = {
+            'dry_run': self.dry_run,
+            'snapshots_deleted': {},
+            'analyses_deleted': 0,
+            'bytes_reclaimed': 0,
+            'idempotency_keys_deleted': 0,
+            'unit_results_deleted': 0,
+            'archive_path': None,
+        }
+        if self.archive and not self.dry_run:
+            self.archive_path = self._open_archive_path(now or timezone.now())
+
+        for reason, queryset in self.expired_querysets(now).items():
+            snapshots, analyses, reclaimed = self._purge(queryset)
+            report['snapshots_deleted'][reason] = snapshots
+            report['analyses_deleted'] += analyses
+            report['bytes_reclaimed'] += reclaimed
+
+        if not self.dry_run:
+            report['idempotency_keys_deleted'] = purge_expired_keys(now=now)
+            report['unit_results_deleted'] = self._purge_unit_results(now or timezone.now())
+
+        if self.archive_path and os.path.exists(self.archive_path):
+            report['archive_path'] = self.archive_path
+        return report
+
+    def _purge(self, queryset):
+        snapshots = analyses = reclaimed = 0
+        last_id = 0
+        queryset = queryset.select_related('analysis').order_by('id')
+
+        while True:
+            batch = list(queryset.filter(id__gt=last_id)[:self.batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            ids = [snapshot.id for snapshot in batch]
+            batch_analyses = sum(1 for snapshot in batch if _get_analysis(snapshot))
+            reclaimed += self._payload_bytes(batch)
+
+            if not self.dry_run:
+                if self.archive_path:
+                    self._archive_batch(batch)
+                with transaction.atomic():
+                    ErpSnapshot.objects.filter(id__in=ids).delete()
+            snapshots += len(batch)
+            analyses += batch_analyses
+            logger.info(f"Retention: purged {len(batch)} snapshots up to id {last_id}")
+
+        return snapshots, analyses, reclaimed
+
+    def _purge_unit_results(self, now):
+        """Drop cached portfolio unit results older than the retention window."""
+        cutoff = now - timedelta(days=self.retention_days)
+        deleted = 0
+        while True:
+            ids = list(
+                PortfolioUnitResult.objects.filter(created_at__lt=cutoff)
+                .values_list('id', flat=True)[:self.batch_size]
+            )
+            if not ids:
+                return deleted
+            deleted += PortfolioUnitResult.objects.filter(id__in=ids).delete()[0]
+
+    def _payload_bytes(self, batch):
+        """Size of the JSON payload columns, as stored by the database when possible."""
+        snapshot_ids = [snapshot.id for snapshot in batch]
+        if connection.vendor == 'postgresql':
+            snapshot_size = ' + '.join(
+                f'pg_column_size(s.{field})' for field in SNAPSHOT_PAYLOAD_FIELDS
+            )
+            analysis_size = ' + '.join(
+                f'pg_column_size(a.{field})' for field in ANALYSIS_PAYLOAD_FIELDS
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"""
+                    SELECT COALESCE(SUM({snapshot_size}), 0)
+                         + COALESCE(SUM({analysis_size}), 0)
+                    FROM core_erpsnapshot s
+                    LEFT JOIN core_analysisresult a ON a.erp_snapshot_id = s.id
+                    WHERE s.id = ANY(%s)
+                    """,
+                    [snapshot_ids]
+                )
+                return int(cursor.fetchone()[0])
+
+        total = 0
+        for snapshot in batch:
+            for field in SNAPSHOT_PAYLOAD_FIELDS:
+                total += len(json.dumps(getattr(snapshot, field), cls=DjangoJSONEncoder))
+            analysis = _get_analysis(snapshot)
+            if analysis:
+                for field in ANALYSIS_PAYLOAD_FIELDS:
+                    total += len(json.dumps(getattr(analysis, field), cls=DjangoJSONEncoder))
+        return total
+
+    def _open_archive_path(self, now):
+        os.makedirs(self.archive_dir, exist_ok=True)
+        filename = f"retention-{now.strftime('%Y%m%dT%H%M%S')}.ndjson.gz"
+        return os.path.join(self.archive_dir, filename)
+
+    def _archive_batch(self, batch):
+        # Each batch is appended as its own gzip member; gzip readers
+        # transparently concatenate them.
+        with gzip.open(self.archive_path, 'at', encoding='utf-8') as archive_file:
+            for snapshot in batch:
+                archive_file.write(json.dumps(_archive_record(snapshot), cls=DjangoJSONEncoder))
+                archive_file.write('\n')
+
+
+def _get_analysis(snapshot):
+    try:
+        return snapshot.analysis
+    except ErpSnapshot.analysis.RelatedObjectDoesNotExist:
+        return None
+
+
+def _archive_record(snapshot):
+    analysis = _get_analysis(snapshot)
+    record = {
+        'snapshot': {
+            'id': snapshot.id,
+            'created_at': snapshot.created_at,
+            'updated_at': snapshot.updated_at,
+            'kind': snapshot.kind,
+            'series': snapshot.series,
+            'previous_id': snapshot.previous_id,
+            **{field: getattr(snapshot, field) for field in SNAPSHOT_PAYLOAD_FIELDS},
+        },
+        'analysis': None,
+    }
+    if analysis:
+        record['analysis'] = {
+            'id': analysis.id,
+            'name': analysis.name,
+            'status': analysis.status,
+            'error_message': analysis.error_message,
+            'created_at': analysis.created_at,
+            'updated_at': analysis.updated_at,
+            'stage_status': analysis.stage_status,
+            **{field: getattr(analysis, field) for field in ANALYSIS_PAYLOAD_FIELDS},
+        }
+    return record
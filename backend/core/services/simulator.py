@@ -0,0 +1,195 @@
+import hashlib
+import json
+import math
+import time
+
+import numpy as np
+
+from .ai_analyzer import SEVERITY_THRESHOLDS
+
+# ERP inputs that feed the thresholded ratios, as "module.field" paths.
+INPUTS = (
+    'sales.total_orders', 'sales.cancelled',
+    'warehouse.skus', 'warehouse.out_of_stock', 'warehouse.dead_stock',
+    'finance.revenue', 'finance.expenses', 'finance.profit',
+    'crm.leads', 'crm.converted', 'crm.lost',
+)
+
+# ratio -> (numerator, denominator); mirrors AIAnalyzer._calculate_ratios.
+RATIO_INPUTS = {
+    'cancellation_rate': ('sales.cancelled', 'sales.total_orders'),
+    'stockout_rate': ('warehouse.out_of_stock', 'warehouse.skus'),
+    'dead_stock_rate': ('warehouse.dead_stock', 'warehouse.skus'),
+    'net_profit_margin': ('finance.profit', 'finance.revenue'),
+    'expense_ratio': ('finance.expenses', 'finance.revenue'),
+    'conversion_rate': ('crm.converted', 'crm.leads'),
+    'loss_rate': ('crm.lost', 'crm.leads'),
+}
+
+SEVERITY_LABELS = {0: 'ok', 1: 'medium', 2: 'high'}
+MAX_SCENARIOS = 200000
+MAX_GRID_VALUES = 1000
+MODES = ('relative', 'absolute')
+
+
+class SimulationError(ValueError):
+    """Raised for grids that cannot be simulated."""
+
+
+def baseline_inputs(raw_data):
+    """Read the numeric ratio inputs from a standard ERP payload (missing -> 0)."""
+    values = {}
+    for path in INPUTS:
+        module, field = path.split('.')
+        module_data = raw_data.get(module) if isinstance(raw_data, dict) else None
+        value = module_data.get(field, 0) if isinstance(module_data, dict) else 0
+        values[path] = float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else 0.0
+    return values
+
+
+def compute_ratios(inputs):
+    """
+    Vectorized ratios (in percent) over arrays of inputs.
+
+    Like AIAnalyzer._calculate_ratios, whose values the LLM is shown, a ratio
+    is 0 where its denominator is 0.
+    """
+    ratios = {}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for ratio, (numerator, denominator) in RATIO_INPUTS.items():
+            denom = inputs[denominator]
+            ratios[ratio] = np.where(denom > 0, inputs[numerator] / denom * 100, 0.0)
+    return ratios
+
+
+def severity_levels(ratios):
+    """Map each thresholded ratio array to levels: 0 ok, 1 medium, 2 high."""
+    levels = {}
+    for ratio, (direction, high, medium) in SEVERITY_THRESHOLDS.items():
+        values = ratios[ratio]
+        if direction == 'above':
+            level = np.where(values > high, 2, np.where(values > medium, 1, 0))
+        else:
+            level = np.where(values < high, 2, np.where(values < medium, 1, 0))
+        levels[ratio] = level
+    return levels
+
+
+def cache_key(snapshot_id, grid, mode, max_results):
+    payload = json.dumps(
+        {'grid': grid, 'mode': mode, 'max_results': max_results},
+        sort_keys=True, separators=(',', ':')
+    )
+    return f"simulation:{snapshot_id}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+def _round(value):
+    return round(float(value), 4)
+
+
+def simulate(raw_data, grid, mode='relative', max_results=50):
+    """
+    Evaluate every combination in ``grid`` against the severity thresholds.
+
+    ``grid`` maps input paths to lists of deltas. In relative mode a delta of
+    -0.5 halves the input; in absolute mode it is added to it. Inputs are varied
+    independently (profit is not re-derived from revenue and expenses). Relative
+    deltas on an input that is 0 in the snapshot are rejected, since they could
+    not change it.
+    """
+    if not grid:
+        raise SimulationError("Provide at least one input to vary")
+    if mode not in MODES:
+        raise SimulationError(f"mode must be one of: {', '.join(MODES)}")
+    unknown = sorted(set(grid) - set(INPUTS))
+    if unknown:
+        raise SimulationError(f"Unknown inputs: {', '.join(unknown)}")
+    too_long = sorted(path for path, values in grid.items() if len(values) > MAX_GRID_VALUES)
+    if too_long:
+        raise SimulationError(
+            f"At most {MAX_GRID_VALUES} values per input: {', '.join(too_long)}"
+        )
+    # Python ints: numpy's int64 product wraps around for large grids.
+    scenario_count = math.prod(len(values) for values in grid.values())
+    if scenario_count > MAX_SCENARIOS:
+        raise SimulationError(f"Grid has {scenario_count} scenarios; the limit is {MAX_SCENARIOS}")
+
+    started = time.perf_counter()
+    base = baseline_inputs(raw_data)
+    if not any(base.values()):
+        raise SimulationError("Snapshot has no standard ERP metrics to simulate")
+    if mode == 'relative':
+        zero_inputs = sorted(
+            path for path, values in grid.items()
+            if base[path] == 0 and any(value != 0 for value in values)
+        )
+        if zero_inputs:
+            raise SimulationError(
+                f"Relative deltas cannot change inputs that are 0 in the snapshot: "
+                f"{', '.join(zero_inputs)}; use absolute mode"
+            )
+
+    paths = list(grid)
+    axes = [np.asarray(grid[path], dtype=float) for path in paths]
+    mesh = [axis.ravel() for axis in np.meshgrid(*axes, indexing='ij')]
+
+    inputs = {}
+    for path in INPUTS:
+        baseline_value = np.array([base[path]])
+        if path in grid:
+            delta = mesh[paths.index(path)]
+            varied = baseline_value * (1 + delta) if mode == 'relative' else baseline_value + delta
+            inputs[path] = np.maximum(varied, 0)
+        else:
+            inputs[path] = baseline_value
+
+    base_ratios = compute_ratios({path: np.array([value]) for path, value in base.items()})
+    base_levels = severity_levels(base_ratios)
+    ratios = compute_ratios(inputs)
+    levels = {
+        ratio: np.broadcast_to(level, (scenario_count,))
+        for ratio, level in severity_levels(ratios).items()
+    }
+
+    changed_by_ratio = {ratio: level != base_levels[ratio][0] for ratio, level in levels.items()}
+    changed = np.logical_or.reduce(list(changed_by_ratio.values()))
+    changed_indices = np.flatnonzero(changed)
+
+    scenarios = []
+    for index in changed_indices[:max_results]:
+        scenarios.append({
+            'deltas': {path: float(mesh[i][index]) for i, path in enumerate(paths)},
+            'changes': {
+                ratio: {
+                    'from': SEVERITY_LABELS[int(base_levels[ratio][0])],
+                    'to': SEVERITY_LABELS[int(levels[ratio][index])],
+                    'value': _round(np.broadcast_to(ratios[ratio], (scenario_count,))[index]),
+                }
+                for ratio in SEVERITY_THRESHOLDS
+                if changed_by_ratio[ratio][index]
+            },
+        })
+
+    distribution = {
+        ratio: {
+            SEVERITY_LABELS[level]: int(count)
+            for level, count in zip(*np.unique(levels[ratio], return_counts=True))
+        }
+        for ratio in SEVERITY_THRESHOLDS
+    }
+
+    return {
+        'mode': mode,
+        'scenario_count': scenario_count,
+        'changed_count': int(changed.sum()),
+        'baseline': {
+            'ratios': {ratio: _round(values[0]) for ratio, values in base_ratios.items()},
+            'severities': {
+                ratio: SEVERITY_LABELS[int(level[0])] for ratio, level in base_levels.items()
+            },
+        },
+        'severity_distribution': distribution,
+        'changed_scenarios': scenarios,
+        'truncated': len(changed_indices) > max_results,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 3),
+    }
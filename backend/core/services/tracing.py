@@ -0,0 +1,203 @@
+import contextvars
+import json
+import logging
+import secrets
+import time
+import urllib.request
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = 'bitoanalyst'
+# Traces kept per analysis; each resume adds one run.
+MAX_RUNS = 5
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    """One timed operation; times are perf_counter seconds relative to the trace."""
+    __slots__ = ('name', 'trace', 'start', 'end', 'attributes', 'children')
+
+    def __init__(self, name, trace, attributes=None):
+        self.name = name
+        self.trace = trace
+        self.start = time.perf_counter()
+        self.end = None
+        self.attributes = dict(attributes or {})
+        self.children = []
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def add(self, **counters):
+        """Increment numeric attributes, e.g. token counts summed over LLM calls."""
+        for key, value in counters.items():
+            if value is not None:
+                self.attributes[key] = self.attributes.get(key, 0) + value
+
+    def to_dict(self):
+        end = self.end if self.end is not None else time.perf_counter()
+        data = {
+            'name': self.name,
+            'start_ms': round((self.start - self.trace.root.start) * 1000, 2),
+            'duration_ms': round((end - self.start) * 1000, 2),
+        }
+        if self.attributes:
+            data['attrs'] = self.attributes
+        if self.children:
+            data['children'] = [child.to_dict() for child in self.children]
+        return data
+
+
+class Trace:
+    def __init__(self, name, attributes=None):
+        self.trace_id = secrets.token_hex(16)
+        self.started_at = time.time()
+        self.root = Span(name, self, attributes)
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'started_at': round(self.started_at, 6),
+            'root': self.root.to_dict(),
+        }
+
+
+class _NoopSpan:
+    """Returned by span() when no trace is active, so callers never branch."""
+
+    def set(self, **attributes):
+        pass
+
+    def add(self, **counters):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+@contextmanager
+def trace(name, **attributes):
+    """Start a new trace, or a child span if a trace is already active."""
+    parent = _current_span.get()
+    if parent is not None:
+        with span(name, **attributes) as child:
+            yield child
+        return
+
+    root = Trace(name, attributes).root
+    token = _current_span.set(root)
+    try:
+        yield root
+    finally:
+        root.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+@contextmanager
+def span(name, **attributes):
+    """Time a block as a child of the current span; a no-op outside a trace."""
+    parent = _current_span.get()
+    if parent is None:
+        yield _NOOP
+        return
+
+    child = Span(name, parent.trace, attributes)
+    parent.children.append(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except Exception as e:
+        child.set(error=str(e)[:200])
+        raise
+    finally:
+        child.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+def current_span():
+    return _current_span.get() or _NOOP
+
+
+def current_trace():
+    current = _current_span.get()
+    return current.trace if current is not None else None
+
+
+def append_run(stored, run):
+    """Add a finished run to an AnalysisResult.trace value, keeping the last MAX_RUNS."""
+    runs = list((stored or {}).get('runs', []))
+    runs.append(run)
+    return {'runs': runs[-MAX_RUNS:]}
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def to_otlp(run, resource_attributes=None):
+    """Convert one stored run to an OTLP/JSON ExportTraceServiceRequest."""
+    base_ns = int(run['started_at'] * 1e9)
+    spans = []
+
+    def visit(node, parent_id):
+        span_id = secrets.token_hex(8)
+        start_ns = base_ns + int(node['start_ms'] * 1e6)
+        otlp_span = {
+            'traceId': run['trace_id'],
+            'spanId': span_id,
+            'name': node['name'],
+            'kind': 1,
+            'startTimeUnixNano': str(start_ns),
+            'endTimeUnixNano': str(start_ns + int(node['duration_ms'] * 1e6)),
+            'attributes': [
+                {'key': key, 'value': _otlp_value(value)}
+                for key, value in node.get('attrs', {}).items()
+            ],
+        }
+        if parent_id:
+            otlp_span['parentSpanId'] = parent_id
+        if 'error' in node.get('attrs', {}):
+            otlp_span['status'] = {'code': 2, 'message': node['attrs']['error']}
+        spans.append(otlp_span)
+        for child in node.get('children', []):
+            visit(child, span_id)
+
+    visit(run['root'], None)
+    attributes = {'service.name': SERVICE_NAME, **(resource_attributes or {})}
+    return {
+        'resourceSpans': [{
+            'resource': {
+                'attributes': [
+                    {'key': key, 'value': _otlp_value(value)} for key, value in attributes.items()
+                ],
+            },
+            'scopeSpans': [{
+                'scope': {'name': __name__},
+                'spans': spans,
+            }],
+        }],
+    }
+
+
+def export_otlp(payload, endpoint, timeout=2):
+    """POST an OTLP/JSON payload to ``<endpoint>/v1/traces``; errors are logged, not raised."""
+    request = urllib.request.Request(
+        endpoint.rstrip('/') + '/v1/traces',
+        data=json.dumps(payload).encode('utf-8'),
+        headers={'Content-Type': 'application/json'},
+        method='POST'
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status
+    except Exception as e:
+        logger.warning(f"OTLP export to {endpoint} failed: {e}")
+        return None
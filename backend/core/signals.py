@@ -0,0 +1,11 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import AnalysisResult
+from .services.result_cache import cache_key
+
+
+@receiver([post_save, post_delete], sender=AnalysisResult)
+def invalidate_cached_result(sender, instance, **kwargs):
+    cache.delete(cache_key(instance.id))
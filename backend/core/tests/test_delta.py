@@ -0,0 +1,107 @@
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase
+
+from core.services.delta import IncrementalAnalyzer, affected_categories, diff_erp_data
+
+BASE = {
+    'sales': {'total_orders': 100, 'cancelled': 20},
+    'warehouse': {'skus': 100, 'out_of_stock': 5},
+    'finance': {'revenue': 1000, 'profit': 100},
+    'crm': {'leads': 100, 'converted': 10},
+}
+
+
+def changed(**modules):
+    data = {module: dict(fields) for module, fields in BASE.items()}
+    for module, fields in modules.items():
+        data.setdefault(module, {}).update(fields)
+    return data
+
+
+class DiffTests(SimpleTestCase):
+    def test_small_change_is_incremental(self):
+        delta = diff_erp_data(BASE, changed(sales={'cancelled': 5}))
+        self.assertTrue(delta['incremental'])
+        self.assertEqual(delta['changed'], {'sales.cancelled': {'from': 20, 'to': 5}})
+        self.assertEqual(delta['change_count'], 1)
+        self.assertEqual(delta['total_metrics'], 8)
+
+    def test_added_and_removed_paths(self):
+        new = changed(crm={'lost': 3})
+        del new['warehouse']['out_of_stock']
+        delta = diff_erp_data(BASE, new)
+        self.assertEqual(delta['added'], {'crm.lost': 3})
+        self.assertEqual(delta['removed'], ['warehouse.out_of_stock'])
+
+    def test_large_change_is_not_incremental(self):
+        new = {module: {field: value + 1 for field, value in fields.items()} for module, fields in BASE.items()}
+        delta = diff_erp_data(BASE, new)
+        self.assertFalse(delta['incremental'])
+        self.assertNotIn('changed', delta)
+
+    def test_identical_data_has_no_changes(self):
+        self.assertEqual(diff_erp_data(BASE, changed())['change_count'], 0)
+
+
+class AffectedCategoriesTests(SimpleTestCase):
+    def test_module_change_also_affects_cross_module_categories(self):
+        delta = diff_erp_data(BASE, changed(finance={'profit': 300}))
+        self.assertEqual(affected_categories(delta), ['finance', 'general', 'operations'])
+
+    def test_unknown_path_affects_everything(self):
+        delta = diff_erp_data(BASE, changed(logistics={'trucks': 3}))
+        self.assertEqual(
+            affected_categories(delta),
+            ['sales', 'warehouse', 'finance', 'crm', 'operations', 'general']
+        )
+
+    def test_no_change_affects_nothing(self):
+        self.assertEqual(affected_categories(diff_erp_data(BASE, changed())), [])
+
+
+class UpdatingAnalyzer:
+    def __init__(self, update):
+        self.update = update
+
+    def _normalize_erp_data(self, erp_data):
+        return erp_data
+
+    def _calculate_ratios(self, erp_data):
+        return {}
+
+    def update_data_quality(self, delta, changed_ratios, previous_findings, categories):
+        self.previous_findings = previous_findings
+        return self.update
+
+
+class UpdateCleaningTests(SimpleTestCase):
+    def test_only_affected_findings_are_replaced(self):
+        base = SimpleNamespace(id=1, erp_snapshot=SimpleNamespace(raw_data=BASE), cleaning_analysis={
+            'red_flags': [
+                {'category': 'sales', 'metric': 'cancellation_rate'},
+                {'category': 'crm', 'metric': 'conversion_rate'},
+                {'category': 'general', 'metric': 'net_profit_margin'},
+            ],
+            'key_insights': [],
+            'data_quality_score': 60,
+        })
+        analyzer = UpdatingAnalyzer({'red_flags': [
+            {'category': 'sales', 'metric': 'cancellation_rate', 'severity': 'low'},
+            # Outside the affected categories: must not duplicate the reused crm flag.
+            {'category': 'crm', 'metric': 'conversion_rate'},
+        ]})
+        delta = diff_erp_data(BASE, changed(sales={'cancelled': 5}))
+        incremental = IncrementalAnalyzer(analyzer, base, delta)
+
+        cleaning = incremental._update_cleaning(changed(sales={'cancelled': 5}), affected_categories(delta))
+
+        self.assertEqual(
+            [(flag['category'], flag.get('severity')) for flag in cleaning['red_flags']],
+            [('crm', None), ('sales', 'low')]
+        )
+        self.assertEqual(
+            [flag['category'] for flag in analyzer.previous_findings['red_flags']],
+            ['sales', 'general']
+        )
+        self.assertEqual(cleaning['data_quality_score'], 60)
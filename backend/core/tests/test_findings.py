@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.test import TestCase
+from django.utils import timezone
+
+from core.auth import generate_token
+from core.models import AnalysisResult, ErpSnapshot, RedFlag
+from core.services.findings import sync_findings
+
+
+class FindingsTests(TestCase):
+    def setUp(self):
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {generate_token(settings.ADMIN_EMAIL)}'}
+        snapshot = ErpSnapshot.objects.create(raw_data={})
+        self.analysis = AnalysisResult.objects.create(
+            erp_snapshot=snapshot, status='completed',
+            cleaning_analysis={'red_flags': [
+                {'severity': 'high', 'category': 'sales', 'metric': 'cancellation_rate',
+                 'value': '20%', 'threshold': 15},
+                {'severity': 'medium', 'category': 'crm', 'metric': 'conversion_rate',
+                 'value': 'n/a'},
+            ]},
+            business_strategy={'top_problems': [{'rank': '1', 'problem': 'p', 'category': 'sales'}]},
+        )
+        sync_findings(self.analysis)
+
+    def get(self, query):
+        return self.client.get(f'/api/red-flags/{query}', **self.headers)
+
+    def test_sync_parses_values_and_replaces_rows(self):
+        flag = RedFlag.objects.get(metric='cancellation_rate')
+        self.assertEqual((flag.value, flag.threshold), (20.0, 15.0))
+        self.assertIsNone(RedFlag.objects.get(metric='conversion_rate').value)
+        sync_findings(self.analysis)
+        self.assertEqual(RedFlag.objects.count(), 2)
+        self.assertEqual(self.analysis.problems.get().rank, 1)
+
+    def test_limit_must_be_positive(self):
+        for limit in ('0', '-1', 'abc'):
+            self.assertEqual(self.get(f'?limit={limit}').status_code, 400, limit)
+        self.assertEqual(len(self.get('?limit=1').json()), 1)
+
+    def test_date_only_until_includes_the_whole_day(self):
+        today = timezone.localdate().isoformat()
+        self.assertEqual(len(self.get(f'?until={today}').json()), 2)
+        self.assertEqual(len(self.get(f'?since={today}&severity=high').json()), 1)
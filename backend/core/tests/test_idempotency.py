@@ -0,0 +1,67 @@
+import json
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase
+from django.utils import timezone
+
+from core.auth import generate_token
+from core.models import AnalysisResult, IdempotencyKey
+from core.services.idempotency import claim_key, release_key, request_fingerprint
+
+from .test_reanalysis import RecordingAnalyzer
+
+
+class ClaimKeyTests(TestCase):
+    def test_first_claim_wins(self):
+        record, created = claim_key('key-1', 'hash')
+        self.assertTrue(created)
+        again, created = claim_key('key-1', 'hash')
+        self.assertFalse(created)
+        self.assertEqual(again.id, record.id)
+
+    def test_expired_key_is_replaced(self):
+        record, _ = claim_key('key-1', 'old')
+        IdempotencyKey.objects.filter(id=record.id).update(expires_at=timezone.now() - timedelta(seconds=1))
+        replacement, created = claim_key('key-1', 'new')
+        self.assertTrue(created)
+        self.assertEqual(replacement.request_hash, 'new')
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+    def test_released_key_can_be_claimed_again(self):
+        record, _ = claim_key('key-1', 'hash')
+        release_key(record)
+        self.assertTrue(claim_key('key-1', 'hash')[1])
+
+    def test_fingerprint_ignores_key_order(self):
+        self.assertEqual(
+            request_fingerprint({'a': 1, 'b': {'c': 2, 'd': 3}}),
+            request_fingerprint({'b': {'d': 3, 'c': 2}, 'a': 1})
+        )
+
+
+class AnalyzeIdempotencyTests(TestCase):
+    def setUp(self):
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {generate_token(settings.ADMIN_EMAIL)}'}
+
+    def post(self, body, key):
+        return self.client.post(
+            '/api/analyze/', json.dumps(body), content_type='application/json',
+            HTTP_IDEMPOTENCY_KEY=key, **self.headers
+        )
+
+    def test_repeated_key_replays_the_first_analysis(self):
+        analyzer = RecordingAnalyzer()
+        body = {'sales': {'total_orders': 100, 'cancelled': 5}}
+        with mock.patch('core.services.pipeline.AIAnalyzer', return_value=analyzer):
+            first = self.post(body, 'submit-1')
+            second = self.post(body, 'submit-1')
+            other_body = self.post({'sales': {'total_orders': 1}}, 'submit-1')
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json()['analysis_id'], first.json()['analysis_id'])
+        self.assertEqual(other_body.status_code, 422)
+        self.assertEqual(analyzer.runs, 1)
+        self.assertEqual(AnalysisResult.objects.count(), 1)
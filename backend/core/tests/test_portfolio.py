@@ -0,0 +1,104 @@
+import json
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase
+
+from core.auth import generate_token
+from core.models import AnalysisResult
+from core.services.ai_analyzer import AIAnalyzer, STAGES
+from core.services.portfolio import PortfolioAnalyzer
+
+
+class StubAnalyzer(AIAnalyzer):
+    """AIAnalyzer without an LLM client; only the local ratio helpers are used."""
+
+    model = 'test-model'
+
+    def __init__(self):
+        self.runs = 0
+
+    def run_full_analysis(self, erp_data, completed=None, on_stage_complete=None, profile=None):
+        self.runs += 1
+        for stage in STAGES:
+            on_stage_complete(stage, {'summary': stage})
+
+
+class UnitStubAnalyzer(StubAnalyzer):
+    """Returns a canned data quality result per unit, keyed by its order count."""
+
+    def analyze_data_quality(self, erp_data, profile=None):
+        orders = erp_data['sales']['total_orders']
+        return {
+            'data_quality_score': orders // 10,
+            'summary': f'{orders} orders',
+            'red_flags': [{'severity': 'high', 'category': 'sales', 'metric': 'orders'}],
+            'key_insights': [{'title': f'{orders} orders', 'impact': 'low'}],
+        }
+
+    def generate_portfolio_strategy(self, unit_summaries, aggregated_ratios):
+        return {'top_problems': []}
+
+    def generate_erp_config(self, business_strategy):
+        return {}
+
+
+def unit(name, **sales):
+    return {'name': name, 'raw_data': {'sales': sales}}
+
+
+class AggregateRatiosTests(TestCase):
+    def setUp(self):
+        self.portfolio = PortfolioAnalyzer(StubAnalyzer(), max_workers=1)
+
+    def test_aov_is_weighted_by_orders(self):
+        ratios = self.portfolio.aggregate_ratios([
+            unit('A', total_orders=300, aov=50),
+            unit('B', total_orders=100, aov=110),
+        ])
+        self.assertEqual(ratios['aov'], 65)
+
+    def test_aov_is_averaged_without_orders(self):
+        ratios = self.portfolio.aggregate_ratios([unit('A', aov=50), unit('B', aov=70)])
+        self.assertEqual(ratios['aov'], 60)
+
+    def test_additive_fields_are_summed(self):
+        ratios = self.portfolio.aggregate_ratios([
+            unit('A', total_orders=100, cancelled=10),
+            unit('B', total_orders=100, cancelled=30),
+        ])
+        self.assertEqual(ratios['cancellation_rate'], 20)
+
+
+class PortfolioDetectionTests(TestCase):
+    def setUp(self):
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {generate_token(settings.ADMIN_EMAIL)}'}
+
+    def test_portfolio_key_in_user_data_runs_standard_analysis(self):
+        analyzer = StubAnalyzer()
+        body = {'raw_data': {'portfolio': [{'sku': 'a', 'qty': 1}, {'sku': 'b', 'qty': 2}]}}
+        with mock.patch('core.services.pipeline.AIAnalyzer', return_value=analyzer):
+            response = self.client.post(
+                '/api/analyze/', json.dumps(body), content_type='application/json', **self.headers
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(analyzer.runs, 1)
+        analysis = AnalysisResult.objects.get(id=response.json()['analysis_id'])
+        self.assertEqual(analysis.erp_snapshot.kind, 'standard')
+
+
+class ConsolidatedCleaningTests(TestCase):
+    def test_score_summary_and_insights_are_consolidated(self):
+        portfolio = PortfolioAnalyzer(UnitStubAnalyzer(), max_workers=1)
+        results = portfolio.run_full_analysis({'portfolio': [
+            unit('North', total_orders=900),
+            unit('South', total_orders=500),
+        ]})
+        cleaning = results['cleaning_analysis']
+        self.assertEqual(cleaning['data_quality_score'], 70)
+        self.assertIn('South (50/100)', cleaning['summary'])
+        self.assertEqual(
+            [(insight['unit'], insight['title']) for insight in cleaning['key_insights']],
+            [('North', '900 orders'), ('South', '500 orders')]
+        )
+        self.assertEqual([flag['unit'] for flag in cleaning['red_flags']], ['North', 'South'])
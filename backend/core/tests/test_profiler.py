@@ -0,0 +1,57 @@
+from django.test import SimpleTestCase
+
+from core.services.findings import to_float
+from core.services.profiler import compact_raw_data, profile_raw_data, profile_table
+
+
+class ToFloatTests(SimpleTestCase):
+    def test_parses_formatted_numbers(self):
+        self.assertEqual(to_float('12.5%'), 12.5)
+        self.assertEqual(to_float(' $1,200 '), 1200)
+        self.assertEqual(to_float(3), 3.0)
+
+    def test_rejects_non_numbers(self):
+        for value in (True, None, 'n/a', {'a': 1}):
+            self.assertIsNone(to_float(value), value)
+
+
+class ProfileTableTests(SimpleTestCase):
+    def test_numeric_and_categorical_columns(self):
+        rows = [[i, f'${i * 10}', 'north' if i % 3 else 'south'] for i in range(1, 11)]
+        profile = profile_table(['qty', 'amount', 'region'], rows)
+
+        self.assertEqual(profile['rows'], 10)
+        self.assertEqual(set(profile['numeric']), {'qty', 'amount'})
+        qty = profile['numeric']['qty']
+        self.assertEqual((qty['min'], qty['max'], qty['mean']), (1.0, 10.0, 5.5))
+        self.assertEqual(qty['quantiles']['p50'], 5.5)
+        self.assertEqual(profile['correlations'], [{'columns': ['qty', 'amount'], 'r': 1.0}])
+
+        region = profile['categorical']['region']
+        self.assertEqual(region['distinct'], 2)
+        self.assertEqual(region['top_values'][0], {'value': 'north', 'count': 7})
+
+    def test_nulls_and_outliers(self):
+        rows = [[value] for value in [10, 11, 9, 10, 12, 10, 11, 9, 10, 500, None, '']]
+        stats = profile_table(['amount'], rows)['numeric']['amount']
+        self.assertEqual(stats['count'], 10)
+        self.assertEqual(stats['null_rate'], round(2 / 12, 4))
+        self.assertEqual(stats['iqr_outliers'], 1)
+
+
+class ProfileRawDataTests(SimpleTestCase):
+    def test_detects_nested_tables_and_compacts_large_ones(self):
+        orders = [{'sku': f's{i}', 'qty': i} for i in range(60)]
+        raw_data = {'sales': {'total_orders': 60, 'orders': orders}, 'crm': {'leads': 5}}
+
+        profile = profile_raw_data(raw_data)
+
+        self.assertEqual([table['path'] for table in profile['tables']], [['sales', 'orders']])
+        self.assertEqual(len(profile['tables'][0]['sample']), 3)
+        compact = compact_raw_data(raw_data, profile)
+        self.assertEqual(compact['sales']['orders'], '<table with 60 rows; see statistical profile>')
+        self.assertEqual(compact['sales']['total_orders'], 60)
+        self.assertEqual(raw_data['sales']['orders'], orders)
+
+    def test_no_tables(self):
+        self.assertEqual(profile_raw_data({'sales': {'total_orders': 1}}), {'tables': []})
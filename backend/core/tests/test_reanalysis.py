@@ -0,0 +1,85 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import AnalysisResult, ErpSnapshot
+from core.services import reanalysis
+from core.services.ai_analyzer import STAGES
+from core.services.pipeline import AnalysisClaimError, claim_analysis, run_analysis
+
+
+class RecordingAnalyzer:
+    """Stands in for AIAnalyzer and completes every stage without calling the LLM."""
+
+    def __init__(self):
+        self.runs = 0
+
+    def run_full_analysis(self, erp_data, completed=None, on_stage_complete=None, profile=None):
+        self.runs += 1
+        for stage in STAGES:
+            on_stage_complete(stage, {'summary': stage})
+
+
+class ClaimTests(TestCase):
+    def setUp(self):
+        snapshot = ErpSnapshot.objects.create(raw_data={'sales': {'total_orders': 10}})
+        self.analysis = AnalysisResult.objects.create(erp_snapshot=snapshot, status='failed')
+
+    def load(self):
+        return AnalysisResult.objects.select_related('erp_snapshot').get(id=self.analysis.id)
+
+    def queue(self):
+        executor = mock.Mock()
+        with mock.patch.object(reanalysis, '_get_executor', return_value=executor):
+            queued = reanalysis.queue_reanalysis([self.analysis.id])
+        self.assertEqual(queued, [self.analysis.id])
+        (_, analysis_id, queued_at), _ = executor.submit.call_args
+        return analysis_id, queued_at
+
+    def test_second_claim_of_same_copy_fails(self):
+        first, second = self.load(), self.load()
+        self.assertTrue(claim_analysis(first, status='pending'))
+        self.assertFalse(claim_analysis(second, status='pending'))
+
+    def test_queued_worker_loses_to_resume(self):
+        _, queued_at = self.queue()
+
+        resumed = self.load()
+        self.assertEqual(resumed.status, 'pending')
+        self.assertTrue(claim_analysis(resumed, status='processing'))
+
+        analyzer = RecordingAnalyzer()
+        worker = self.load()
+        worker.status, worker.updated_at = 'pending', queued_at
+        with self.assertRaises(AnalysisClaimError):
+            run_analysis(worker, analyzer=analyzer)
+        self.assertEqual(analyzer.runs, 0)
+
+    def test_reloaded_processing_row_is_not_claimed(self):
+        self.assertTrue(claim_analysis(self.load(), status='processing'))
+
+        analyzer = RecordingAnalyzer()
+        with self.assertRaises(AnalysisClaimError):
+            run_analysis(self.load(), analyzer=analyzer)
+        self.assertEqual(analyzer.runs, 0)
+        self.assertEqual(self.load().status, 'processing')
+
+    def test_queued_worker_runs_when_uncontested(self):
+        _, queued_at = self.queue()
+
+        analyzer = RecordingAnalyzer()
+        worker = self.load()
+        worker.status, worker.updated_at = 'pending', queued_at
+        run_analysis(worker, analyzer=analyzer)
+        self.assertEqual(analyzer.runs, 1)
+        self.assertEqual(self.load().status, 'completed')
+
+    def test_stale_processing_row_is_claimed(self):
+        AnalysisResult.objects.filter(id=self.analysis.id).update(
+            status='processing', updated_at=timezone.now() - timedelta(hours=2)
+        )
+        analyzer = RecordingAnalyzer()
+        run_analysis(self.load(), analyzer=analyzer)
+        self.assertEqual(analyzer.runs, 1)
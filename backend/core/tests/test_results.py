@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase
+
+from core.auth import generate_token
+from core.models import AnalysisResult, ErpSnapshot
+
+
+class ResultValidatorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {generate_token(settings.ADMIN_EMAIL)}'}
+        self.snapshot = ErpSnapshot.objects.create(raw_data={'sales': {'total_orders': 10}})
+        self.analysis = AnalysisResult.objects.create(erp_snapshot=self.snapshot, status='processing')
+        self.url = f'/api/results/{self.analysis.id}/'
+
+    def test_unchanged_result_is_not_modified(self):
+        etag = self.client.get(self.url, **self.headers)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag, **self.headers)
+        self.assertEqual(response.status_code, 304)
+
+    def test_snapshot_profile_save_changes_etag(self):
+        etag = self.client.get(self.url, **self.headers)['ETag']
+
+        self.snapshot.profile = {'tables': []}
+        self.snapshot.save(update_fields=['profile', 'updated_at'])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag, **self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['erp_snapshot']['profile'], {'tables': []})
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class ListAnalysesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {generate_token(settings.ADMIN_EMAIL)}'}
+        for _ in range(3):
+            snapshot = ErpSnapshot.objects.create(
+                raw_data={'sales': {}}, profile={'tables': [{'rows': 60}]}, delta={'change_count': 1}
+            )
+            AnalysisResult.objects.create(erp_snapshot=snapshot, status='completed')
+
+    def test_list_leaves_out_profile_and_delta(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/analyses/', **self.headers)
+        snapshots = [row['erp_snapshot'] for row in response.json()]
+        self.assertEqual(len(snapshots), 3)
+        for snapshot in snapshots:
+            self.assertNotIn('profile', snapshot)
+            self.assertNotIn('delta', snapshot)
+
+    def test_detail_includes_profile_and_delta(self):
+        analysis = AnalysisResult.objects.first()
+        snapshot = self.client.get(f'/api/results/{analysis.id}/', **self.headers).json()['erp_snapshot']
+        self.assertEqual(snapshot['profile'], {'tables': [{'rows': 60}]})
+        self.assertEqual(snapshot['delta'], {'change_count': 1})
@@ -0,0 +1,41 @@
+import gzip
+import json
+import tempfile
+
+from django.test import TestCase
+
+from core.models import AnalysisResult, ErpSnapshot
+from core.services.retention import RetentionEngine
+
+
+class RetentionTests(TestCase):
+    def setUp(self):
+        snapshot = ErpSnapshot.objects.create(
+            raw_data={'sales': {'total_orders': 10}},
+            profile={'tables': [{'rows': 10}]},
+            delta={'change_count': 1},
+        )
+        AnalysisResult.objects.create(
+            erp_snapshot=snapshot, status='completed',
+            cleaning_analysis={'summary': 'ok'}, trace={'runs': [{'name': 'run_analysis'}]},
+        )
+
+    def test_reclaimed_bytes_cover_every_payload_column(self):
+        report = RetentionEngine(retention_days=0, dry_run=True).run()
+        payload = [
+            {'sales': {'total_orders': 10}}, {'tables': [{'rows': 10}]}, {'change_count': 1},
+            {'summary': 'ok'}, {}, {}, {'runs': [{'name': 'run_analysis'}]},
+        ]
+        self.assertEqual(report['bytes_reclaimed'], sum(len(json.dumps(value)) for value in payload))
+        self.assertEqual(ErpSnapshot.objects.count(), 1)
+
+    def test_archive_keeps_snapshot_and_analysis_fields(self):
+        with tempfile.TemporaryDirectory() as archive_dir:
+            report = RetentionEngine(retention_days=0, archive_dir=archive_dir).run()
+            with gzip.open(report['archive_path'], 'rt', encoding='utf-8') as archive_file:
+                record = json.loads(archive_file.readline())
+        self.assertEqual(record['snapshot']['profile'], {'tables': [{'rows': 10}]})
+        self.assertEqual(record['snapshot']['delta'], {'change_count': 1})
+        self.assertEqual(record['snapshot']['kind'], 'standard')
+        self.assertEqual(record['analysis']['trace'], {'runs': [{'name': 'run_analysis'}]})
+        self.assertEqual(ErpSnapshot.objects.count(), 0)
@@ -0,0 +1,53 @@
+from django.test import SimpleTestCase
+
+from core.services.ai_analyzer import AIAnalyzer, SEVERITY_THRESHOLDS
+from core.services.simulator import INPUTS, MAX_GRID_VALUES, SimulationError, simulate
+
+STANDARD = {
+    'sales': {'total_orders': 100, 'cancelled': 20},
+    'warehouse': {'skus': 100, 'out_of_stock': 5, 'dead_stock': 10},
+    'finance': {'revenue': 1000, 'expenses': 900, 'profit': 100},
+    'crm': {'leads': 100, 'converted': 10, 'lost': 5},
+}
+
+
+class SimulateTests(SimpleTestCase):
+    def test_baseline_ratios_match_prompt_ratios(self):
+        # No revenue and no leads: the prompt shows these ratios as 0.
+        raw_data = {**STANDARD, 'finance': {'revenue': 0}, 'crm': {'leads': 0}}
+        result = simulate(raw_data, {'sales.cancelled': [0]})
+        prompt_ratios = AIAnalyzer._calculate_ratios(None, raw_data)
+        for ratio in SEVERITY_THRESHOLDS:
+            self.assertEqual(result['baseline']['ratios'][ratio], prompt_ratios[ratio], ratio)
+        self.assertEqual(result['baseline']['severities']['net_profit_margin'], 'high')
+        self.assertEqual(result['baseline']['severities']['conversion_rate'], 'high')
+
+    def test_relative_grid_changes_severity(self):
+        result = simulate(STANDARD, {'sales.cancelled': [-0.5, 0]})
+        self.assertEqual(result['scenario_count'], 2)
+        self.assertEqual(result['changed_count'], 1)
+        self.assertEqual(
+            result['changed_scenarios'][0]['changes']['cancellation_rate'],
+            {'from': 'high', 'to': 'ok', 'value': 10.0}
+        )
+
+    def test_absolute_mode_adds_deltas(self):
+        result = simulate(STANDARD, {'crm.converted': [15]}, mode='absolute')
+        self.assertEqual(
+            result['changed_scenarios'][0]['changes']['conversion_rate']['to'], 'ok'
+        )
+
+    def test_relative_delta_on_zero_input_is_rejected(self):
+        raw_data = {**STANDARD, 'sales': {'total_orders': 100, 'cancelled': 0}}
+        with self.assertRaisesMessage(SimulationError, 'sales.cancelled'):
+            simulate(raw_data, {'sales.cancelled': [0.5]})
+        result = simulate(raw_data, {'sales.cancelled': [20]}, mode='absolute')
+        self.assertEqual(result['changed_count'], 1)
+
+    def test_huge_grid_is_rejected_before_building_it(self):
+        # 64 ** 11 overflows int64 to 0 if counted with NumPy.
+        grid = {path: [0.1] * 64 for path in INPUTS}
+        with self.assertRaisesMessage(SimulationError, f'{64 ** 11} scenarios'):
+            simulate(STANDARD, grid)
+        with self.assertRaisesMessage(SimulationError, f'At most {MAX_GRID_VALUES} values'):
+            simulate(STANDARD, {'sales.cancelled': [0.1] * (MAX_GRID_VALUES + 1)})
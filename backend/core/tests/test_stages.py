@@ -0,0 +1,33 @@
+from django.test import SimpleTestCase
+
+from core.services.ai_analyzer import STAGES, run_stages
+
+
+class RunStagesTests(SimpleTestCase):
+    def test_completed_stages_are_reused_and_new_ones_checkpointed(self):
+        saved = []
+        results = run_stages(
+            {
+                'cleaning_analysis': lambda results: self.fail('completed stage re-ran'),
+                'business_strategy': lambda results: {'from': results['cleaning_analysis']},
+                'erp_actions': lambda results: {'from': results['business_strategy']},
+            },
+            completed={'cleaning_analysis': 'cached'},
+            on_stage_complete=lambda stage, output: saved.append(stage)
+        )
+        self.assertEqual(saved, ['business_strategy', 'erp_actions'])
+        self.assertEqual(results['erp_actions'], {'from': {'from': 'cached'}})
+
+    def test_failure_keeps_earlier_checkpoints(self):
+        saved = {}
+
+        def fail(results):
+            raise RuntimeError('provider outage')
+
+        with self.assertRaises(RuntimeError):
+            run_stages(
+                {stage: (fail if stage == 'business_strategy' else lambda results: 'done')
+                 for stage in STAGES},
+                on_stage_complete=saved.__setitem__
+            )
+        self.assertEqual(saved, {'cleaning_analysis': 'done'})
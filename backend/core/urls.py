@@ -5,7 +5,14 @@ urlpatterns = [
     path('health/', views.health, name='health'),
     path('auth/login/', views.login, name='login'),
     path('analyze/', views.analyze_erp_data, name='analyze'),
+    path('portfolio/analyze/', views.analyze_portfolio, name='analyze-portfolio'),
     path('results/<int:analysis_id>/', views.get_analysis_result, name='result'),
     path('analyses/', views.list_analyses, name='list'),
     path('analyses/<int:analysis_id>/', views.delete_analysis, name='delete'),
+    path('analyses/<int:analysis_id>/resume/', views.resume_analysis, name='resume'),
+    path('analyses/<int:analysis_id>/simulate/', views.simulate_analysis, name='simulate'),
+    path('red-flags/', views.list_red_flags, name='red-flags'),
+    path('red-flags/summary/', views.red_flag_summary, name='red-flags-summary'),
+    path('problems/', views.list_problems, name='problems'),
+    path('problems/summary/', views.problem_summary, name='problems-summary'),
 ]
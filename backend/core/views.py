@@ -1,16 +1,38 @@
 import logging
+from datetime import datetime
 from rest_framework import status
 from rest_framework.decorators import api_view
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from django.conf import settings
-from .models import ErpSnapshot, AnalysisResult
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, Max
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import http_date
+from .models import ErpSnapshot, AnalysisResult, RedFlag, Problem
 from .serializers import (
     ErpSnapshotSerializer, 
     AnalysisResultSerializer, 
-    AnalysisRequestSerializer
+    AnalysisResultListSerializer,
+    AnalysisRequestSerializer,
+    PortfolioRequestSerializer,
+    SimulationRequestSerializer,
+    RedFlagSerializer,
+    ProblemSerializer
 )
-from .services.ai_analyzer import AIAnalyzer
+from .services.ai_analyzer import STAGES
+from .services.delta import diff_erp_data, find_previous_snapshot
+from .services.idempotency import MAX_KEY_LENGTH, claim_key, release_key, request_fingerprint
+from .services.pipeline import AnalysisClaimError, run_analysis
+from .services.result_cache import cache_key as result_cache_key, etag as result_etag
+from .services.simulator import SimulationError, cache_key, simulate
+from .services.tracing import span, to_otlp, trace
 from .auth import generate_token, require_api_auth
+from .db_router import pins_primary, replica_reads
 
 logger = logging.getLogger(__name__)
 
@@ -35,13 +57,132 @@ def login(request):
     return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
 
 
+def _idempotent_replay(record, fingerprint):
+    """Response for a request whose Idempotency-Key was already used."""
+    if record.request_hash != fingerprint:
+        return Response(
+            {'error': 'Idempotency-Key was already used with a different request body'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+
+    analysis = record.analysis
+    if analysis is None:
+        response = Response(
+            {'error': 'A request with this Idempotency-Key is still being started'},
+            status=status.HTTP_409_CONFLICT
+        )
+        response['Retry-After'] = '1'
+        return response
+
+    body = {
+        'analysis_id': analysis.id,
+        'snapshot_id': analysis.erp_snapshot_id,
+        'status': analysis.status,
+    }
+    if analysis.status == 'completed':
+        body['message'] = 'Analysis completed successfully'
+        response_status = status.HTTP_200_OK
+    elif analysis.status == 'failed':
+        body.update({'error': 'Failed to start analysis', 'details': analysis.error_message})
+        response_status = status.HTTP_500_INTERNAL_SERVER_ERROR
+    else:
+        body['message'] = 'Analysis is already in progress'
+        response_status = status.HTTP_202_ACCEPTED
+
+    response = Response(body, status=response_status)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _erp_data_from(validated_data):
+    """Build snapshot data from either raw_data or the standard ERP modules."""
+    if 'raw_data' in validated_data:
+        return validated_data['raw_data']
+    return {
+        'sales': validated_data.get('sales', {}),
+        'warehouse': validated_data.get('warehouse', {}),
+        'finance': validated_data.get('finance', {}),
+        'crm': validated_data.get('crm', {}),
+    }
+
+
+def _claim_idempotency(request):
+    """
+    Claim the request's Idempotency-Key, if any.
+
+    Returns ``(record, response)``; when ``response`` is set the request is a
+    repeat (or invalid) and that response should be returned as is.
+    """
+    idempotency_key = request.headers.get('Idempotency-Key', '').strip()
+    if not idempotency_key:
+        return None, None
+    if len(idempotency_key) > MAX_KEY_LENGTH:
+        return None, Response(
+            {'error': f'Idempotency-Key must be at most {MAX_KEY_LENGTH} characters'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    fingerprint = request_fingerprint({'path': request.path, 'body': request.data})
+    record, created = claim_key(idempotency_key, fingerprint)
+    if not created:
+        return record, _idempotent_replay(record, fingerprint)
+    return record, None
+
+
+def _create_and_run_analysis(erp_data, name, idempotency_record=None, extra=None,
+                             snapshot_fields=None):
+    """Create the snapshot and analysis rows, run the pipeline and build the response."""
+    analysis = None
+    try:
+        with span('db.create'), transaction.atomic():
+            snapshot = ErpSnapshot.objects.create(raw_data=erp_data, **(snapshot_fields or {}))
+
+            # Create analysis result record
+            analysis = AnalysisResult.objects.create(
+                erp_snapshot=snapshot,
+                status='pending',
+                name=name
+            )
+
+            if idempotency_record:
+                idempotency_record.analysis = analysis
+                idempotency_record.save(update_fields=['analysis'])
+
+        run_analysis(analysis)
+
+        return Response({
+            'message': 'Analysis completed successfully',
+            'analysis_id': analysis.id,
+            'snapshot_id': snapshot.id,
+            'status': 'completed',
+            **(extra or {})
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        logger.error(f"Error creating analysis: {e}")
+        if idempotency_record and analysis is None:
+            release_key(idempotency_record)
+        return Response(
+            {
+                'error': 'Failed to start analysis',
+                'details': str(e),
+                'analysis_id': analysis.id if analysis else None
+            },
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
 @api_view(['POST'])
 @require_api_auth
+@pins_primary
 def analyze_erp_data(request):
     """
     POST /api/analyze/
     
     Accepts ERP data and runs analysis synchronously.
+    Repeating a request with the same Idempotency-Key header returns the
+    existing analysis instead of starting a new one. With a ``series`` name,
+    a small change against the series' previous snapshot is analyzed
+    incrementally from the previous results.
     """
     serializer = AnalysisRequestSerializer(data=request.data)
     
@@ -50,74 +191,253 @@ def analyze_erp_data(request):
             {'error': 'Invalid data', 'details': serializer.errors},
             status=status.HTTP_400_BAD_REQUEST
         )
-    
-    try:
-        # Create ERP snapshot with flexible schema support
-        if 'raw_data' in serializer.validated_data:
-            erp_data = serializer.validated_data['raw_data']
-        else:
-            erp_data = {
-                'sales': serializer.validated_data.get('sales', {}),
-                'warehouse': serializer.validated_data.get('warehouse', {}),
-                'finance': serializer.validated_data.get('finance', {}),
-                'crm': serializer.validated_data.get('crm', {}),
-            }
-        
-        snapshot = ErpSnapshot.objects.create(raw_data=erp_data)
-        
-        # Create analysis result record
-        analysis = AnalysisResult.objects.create(
-            erp_snapshot=snapshot,
-            status='pending',
-            name=serializer.validated_data.get('name', '')
+
+    idempotency_record, replay = _claim_idempotency(request)
+    if replay:
+        return replay
+
+    with trace('POST /api/analyze/'):
+        erp_data = _erp_data_from(serializer.validated_data)
+        snapshot_fields, extra = {}, {}
+        series = serializer.validated_data.get('series', '')
+        if series:
+            snapshot_fields['series'] = series
+            previous = find_previous_snapshot(series)
+            if previous and serializer.validated_data.get('incremental', True):
+                with span('delta.diff'):
+                    delta = diff_erp_data(previous.raw_data, erp_data)
+                snapshot_fields.update(previous=previous, delta=delta)
+                extra = {
+                    'incremental': delta['incremental'],
+                    'previous_snapshot_id': previous.id,
+                    'changed_metrics': delta['change_count'],
+                }
+
+        return _create_and_run_analysis(
+            erp_data,
+            serializer.validated_data.get('name', ''),
+            idempotency_record,
+            extra=extra,
+            snapshot_fields=snapshot_fields
+        )
+
+
+@api_view(['POST'])
+@require_api_auth
+@pins_primary
+def analyze_portfolio(request):
+    """
+    POST /api/portfolio/analyze/
+
+    Accepts several business units and produces one consolidated analysis.
+    Per-unit data quality results are cached, so re-submitting a portfolio
+    with one extra unit only analyzes that unit before the consolidation.
+    """
+    serializer = PortfolioRequestSerializer(data=request.data)
+
+    if not serializer.is_valid():
+        return Response(
+            {'error': 'Invalid data', 'details': serializer.errors},
+            status=status.HTTP_400_BAD_REQUEST
         )
 
-        analysis.status = 'processing'
-        analysis.save()
+    idempotency_record, replay = _claim_idempotency(request)
+    if replay:
+        return replay
+
+    units = [
+        {'name': unit['name'], 'raw_data': _erp_data_from(unit)}
+        for unit in serializer.validated_data['units']
+    ]
+    with trace('POST /api/portfolio/analyze/', units=len(units)):
+        return _create_and_run_analysis(
+            {'portfolio': units},
+            serializer.validated_data.get('name', ''),
+            idempotency_record,
+            extra={'units': len(units)},
+            snapshot_fields={'kind': 'portfolio'}
+        )
+
+
+@api_view(['POST'])
+@require_api_auth
+@pins_primary
+def resume_analysis(request, analysis_id):
+    """
+    POST /api/analyses/<id>/resume/
 
-        analyzer = AIAnalyzer()
-        results = analyzer.run_full_analysis(snapshot.raw_data)
+    Re-runs only the stages of a failed analysis that have not completed yet.
+    """
+    try:
+        analysis = AnalysisResult.objects.select_related('erp_snapshot').get(id=analysis_id)
+    except AnalysisResult.DoesNotExist:
+        return Response(
+            {'error': 'Analysis not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
 
-        analysis.cleaning_analysis = results['cleaning_analysis']
-        analysis.business_strategy = results['business_strategy']
-        analysis.erp_actions = results['erp_actions']
-        analysis.status = 'completed'
-        analysis.save()
+    if analysis.status in ('completed', 'processing'):
+        return Response(
+            {'error': f'Analysis is already {analysis.status}'},
+            status=status.HTTP_409_CONFLICT
+        )
 
+    resumed_stages = [
+        stage for stage in STAGES if analysis.stage_status.get(stage) != 'completed'
+    ]
+    try:
+        run_analysis(analysis)
         return Response({
-            'message': 'Analysis completed successfully',
+            'message': 'Analysis resumed successfully',
             'analysis_id': analysis.id,
-            'snapshot_id': snapshot.id,
+            'resumed_stages': resumed_stages,
             'status': 'completed'
         }, status=status.HTTP_200_OK)
-        
+    except AnalysisClaimError as e:
+        return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
     except Exception as e:
-        logger.error(f"Error creating analysis: {e}")
-        try:
-            analysis.status = 'failed'
-            analysis.error_message = str(e)
-            analysis.save()
-        except Exception:
-            pass
+        logger.error(f"Error resuming analysis {analysis_id}: {e}")
         return Response(
-            {'error': 'Failed to start analysis', 'details': str(e)},
+            {
+                'error': 'Failed to resume analysis',
+                'details': str(e),
+                'stage_status': analysis.stage_status
+            },
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
 
+@api_view(['POST'])
+@require_api_auth
+def simulate_analysis(request, analysis_id):
+    """
+    POST /api/analyses/<id>/simulate/
+
+    Recomputes ratios and red flag severities locally for parameter deltas or
+    grids of deltas, without calling the LLM.
+    """
+    serializer = SimulationRequestSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(
+            {'error': 'Invalid data', 'details': serializer.errors},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        analysis = AnalysisResult.objects.select_related('erp_snapshot').get(id=analysis_id)
+    except AnalysisResult.DoesNotExist:
+        return Response(
+            {'error': 'Analysis not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    params = serializer.validated_data
+    key = cache_key(analysis.erp_snapshot_id, params['grid'], params['mode'], params['max_results'])
+    result = cache.get(key)
+    if result is None:
+        try:
+            result = simulate(
+                analysis.erp_snapshot.raw_data,
+                params['grid'],
+                mode=params['mode'],
+                max_results=params['max_results']
+            )
+        except SimulationError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        cache.set(key, result, settings.SIMULATION_CACHE_TIMEOUT)
+
+    return Response({'analysis_id': analysis.id, **result})
+
+
+def _conditional_response(request, response, etag, last_modified):
+    """Attach validators and turn the response into a 304 when the client is current."""
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Clients may store the body but must revalidate it on every poll.
+    response['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(response, ['Authorization'])
+    return get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified.timestamp()), response=response
+    )
+
+
+def _trace_result(request, analysis_id):
+    analysis = AnalysisResult.objects.select_related('erp_snapshot').get(id=analysis_id)
+    data = AnalysisResultSerializer(analysis).data
+    runs = analysis.trace.get('runs', [])
+    if request.query_params.get('trace_format') == 'otlp':
+        data['trace'] = {
+            'resourceSpans': [
+                resource_spans
+                for run in runs
+                for resource_spans in to_otlp(run, {'analysis.id': analysis.id})['resourceSpans']
+            ]
+        }
+    else:
+        data['trace'] = {'runs': runs}
+    return Response(data)
+
+
 @api_view(['GET'])
 @require_api_auth
+@replica_reads
 def get_analysis_result(request, analysis_id):
     """
     GET /api/results/<id>/
     
     Returns analysis status and results if complete.
+    ``?include=trace`` adds the timing spans of the latest runs;
+    ``&trace_format=otlp`` returns them as an OTLP/JSON export request.
+
+    Responses carry an ETag and Last-Modified, so polling clients get a 304
+    without the row being loaded or serialized. Completed results no longer
+    change, so bodies up to RESULT_CACHE_MAX_BYTES are cached briefly.
     """
     try:
-        analysis = AnalysisResult.objects.get(id=analysis_id)
-        serializer = AnalysisResultSerializer(analysis)
-        
-        return Response(serializer.data)
+        if 'trace' in request.query_params.get('include', '').split(','):
+            return _trace_result(request, analysis_id)
+
+        cached = cache.get(result_cache_key(analysis_id))
+        if cached is None:
+            state = (
+                AnalysisResult.objects.filter(id=analysis_id)
+                .values('status', 'updated_at', 'erp_snapshot__updated_at')
+                .first()
+            )
+            if state is None:
+                raise AnalysisResult.DoesNotExist
+            not_modified = _conditional_response(
+                request,
+                HttpResponse(),
+                result_etag(
+                    analysis_id, state['status'], state['updated_at'],
+                    state['erp_snapshot__updated_at']
+                ),
+                max(state['updated_at'], state['erp_snapshot__updated_at'])
+            )
+            if not_modified.status_code == status.HTTP_304_NOT_MODIFIED:
+                return not_modified
+
+            analysis = AnalysisResult.objects.select_related('erp_snapshot').get(id=analysis_id)
+            cached = {
+                'etag': result_etag(
+                    analysis.id, analysis.status, analysis.updated_at,
+                    analysis.erp_snapshot.updated_at
+                ),
+                'last_modified': max(analysis.updated_at, analysis.erp_snapshot.updated_at),
+                'content': JSONRenderer().render(AnalysisResultSerializer(analysis).data),
+            }
+            # Large snapshots are not worth holding in every worker's memory.
+            if (analysis.status == 'completed'
+                    and len(cached['content']) <= settings.RESULT_CACHE_MAX_BYTES):
+                cache.set(result_cache_key(analysis_id), cached, settings.RESULT_CACHE_TIMEOUT)
+
+        return _conditional_response(
+            request,
+            HttpResponse(cached['content'], content_type='application/json'),
+            cached['etag'],
+            cached['last_modified']
+        )
         
     except AnalysisResult.DoesNotExist:
         return Response(
@@ -134,6 +454,7 @@ def get_analysis_result(request, analysis_id):
 
 @api_view(['GET'])
 @require_api_auth
+@replica_reads
 def list_analyses(request):
     """
     GET /api/analyses/
@@ -143,12 +464,16 @@ def list_analyses(request):
     try:
         status_filter = request.query_params.get('status', None)
         
-        analyses = AnalysisResult.objects.all().order_by('-created_at')
+        analyses = (
+            AnalysisResult.objects.select_related('erp_snapshot')
+            .defer('trace', 'erp_snapshot__profile', 'erp_snapshot__delta')
+            .order_by('-created_at')
+        )
         
         if status_filter:
             analyses = analyses.filter(status=status_filter)
         
-        serializer = AnalysisResultSerializer(analyses, many=True)
+        serializer = AnalysisResultListSerializer(analyses, many=True)
         return Response(serializer.data)
         
     except Exception as e:
@@ -160,6 +485,7 @@ def list_analyses(request):
 
 @api_view(['DELETE'])
 @require_api_auth
+@pins_primary
 def delete_analysis(request, analysis_id):
     """
     DELETE /api/analyses/<id>/
@@ -168,7 +494,8 @@ def delete_analysis(request, analysis_id):
     """
     try:
         analysis = AnalysisResult.objects.get(id=analysis_id)
-        analysis.delete()
+        # Deleting the snapshot cascades to the analysis and its findings.
+        analysis.erp_snapshot.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
     except AnalysisResult.DoesNotExist:
         return Response(
@@ -181,3 +508,138 @@ def delete_analysis(request, analysis_id):
             {'error': 'Failed to delete analysis', 'details': str(e)},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+
+
+FINDINGS_FILTERS = {
+    'red_flags': ('severity', 'category', 'metric'),
+    'problems': ('category', 'action_priority', 'rank'),
+}
+FINDINGS_GROUP_BY = {
+    'red_flags': ('severity', 'category', 'metric'),
+    'problems': ('category', 'action_priority', 'rank'),
+}
+FINDINGS_MAX_LIMIT = 1000
+
+
+def _parse_timestamp(value):
+    """Accept either a plain YYYY-MM-DD date or an ISO datetime."""
+    if not value:
+        return None
+    parsed = parse_date(value)
+    if parsed is None:
+        parsed = parse_datetime(value)
+        if parsed is not None and timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+    if parsed is None:
+        raise ValueError(f"Invalid date: {value}")
+    return parsed
+
+
+def _filter_findings(queryset, params, kind):
+    """Apply the shared field, analysis and created_at filters to a findings queryset."""
+    for field in FINDINGS_FILTERS[kind]:
+        value = params.get(field)
+        if value:
+            queryset = queryset.filter(**{field: value})
+    if params.get('analysis'):
+        queryset = queryset.filter(analysis_id=params['analysis'])
+
+    since = _parse_timestamp(params.get('since'))
+    until = _parse_timestamp(params.get('until'))
+    if since:
+        lookup = 'created_at__gte' if isinstance(since, datetime) else 'created_at__date__gte'
+        queryset = queryset.filter(**{lookup: since})
+    if until:
+        lookup = 'created_at__lte' if isinstance(until, datetime) else 'created_at__date__lte'
+        queryset = queryset.filter(**{lookup: until})
+    return queryset
+
+
+def _list_findings(request, kind, queryset, serializer_class):
+    try:
+        queryset = _filter_findings(queryset, request.query_params, kind)
+        limit = min(int(request.query_params.get('limit', 100)), FINDINGS_MAX_LIMIT)
+        if limit < 1:
+            raise ValueError("limit must be a positive integer")
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    serializer = serializer_class(queryset[:limit], many=True)
+    return Response(serializer.data)
+
+
+def _summarize_findings(request, kind, queryset, extra_aggregates=None):
+    group_by = request.query_params.get('group_by', 'category')
+    if group_by not in FINDINGS_GROUP_BY[kind]:
+        return Response(
+            {'error': f"group_by must be one of: {', '.join(FINDINGS_GROUP_BY[kind])}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        queryset = _filter_findings(queryset, request.query_params, kind)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    rows = (
+        queryset.order_by()
+        .values(group_by)
+        .annotate(
+            count=Count('id'),
+            analyses=Count('analysis', distinct=True),
+            last_seen=Max('created_at'),
+            **(extra_aggregates or {})
+        )
+        .order_by('-count')
+    )
+    return Response({'group_by': group_by, 'results': list(rows)})
+
+
+@api_view(['GET'])
+@require_api_auth
+@replica_reads
+def list_red_flags(request):
+    """
+    GET /api/red-flags/
+
+    Filter by severity, category, metric, analysis, since and until.
+    """
+    return _list_findings(request, 'red_flags', RedFlag.objects.all(), RedFlagSerializer)
+
+
+@api_view(['GET'])
+@require_api_auth
+@replica_reads
+def red_flag_summary(request):
+    """
+    GET /api/red-flags/summary/?group_by=severity|category|metric
+
+    Counts red flags per group in SQL, with the same filters as the list.
+    """
+    return _summarize_findings(
+        request, 'red_flags', RedFlag.objects.all(),
+        extra_aggregates={'avg_value': Avg('value')}
+    )
+
+
+@api_view(['GET'])
+@require_api_auth
+@replica_reads
+def list_problems(request):
+    """
+    GET /api/problems/
+
+    Filter by category, action_priority, rank, analysis, since and until.
+    """
+    return _list_findings(request, 'problems', Problem.objects.all(), ProblemSerializer)
+
+
+@api_view(['GET'])
+@require_api_auth
+@replica_reads
+def problem_summary(request):
+    """
+    GET /api/problems/summary/?group_by=category|action_priority|rank
+
+    Counts problems per group in SQL; use rank=1 for the most common top problem.
+    """
+    return _summarize_findings(request, 'problems', Problem.objects.all())
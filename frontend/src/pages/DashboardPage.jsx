@@ -9,8 +9,9 @@ import {
   Briefcase,
   Settings2,
   CalendarClock,
+  RotateCcw,
 } from 'lucide-react'
-import { getAnalysisResult } from '../services/api'
+import { getAnalysisResult, resumeAnalysis } from '../services/api'
 import DataHealthTab from '../components/DataHealthTab'
 import StrategyTab from '../components/StrategyTab'
 import BitoActionsTab from '../components/BitoActionsTab'
@@ -23,6 +24,8 @@ const DashboardPage = () => {
   const [activeTab, setActiveTab] = useState('health')
   const [pollingPaused, setPollingPaused] = useState(false)
   const [pollingMessage, setPollingMessage] = useState(null)
+  const [resuming, setResuming] = useState(false)
+  const [resumeError, setResumeError] = useState(null)
   const pollAttempts = useRef(0)
   const pollTimeout = useRef(null)
 
@@ -75,6 +78,20 @@ const DashboardPage = () => {
     fetchAnalysis()
   }
 
+  const handleResume = async () => {
+    setResuming(true)
+    setResumeError(null)
+    try {
+      await resumeAnalysis(analysisId)
+    } catch (err) {
+      setResumeError(err.response?.data?.details || err.response?.data?.error || 'Unable to resume analysis.')
+    } finally {
+      setResuming(false)
+      pollAttempts.current = 0
+      fetchAnalysis()
+    }
+  }
+
   if (loading) {
     return (
       <div className="flex flex-col items-center justify-center py-20">
@@ -194,9 +211,22 @@ const DashboardPage = () => {
       )}
 
       {isFailed && (
-        <div className="p-4 bg-rose-50 border border-rose-200 rounded-2xl">
-          <h3 className="font-semibold text-rose-700 mb-2">Analysis failed</h3>
-          <p className="text-rose-600">{analysis.error_message || 'An error occurred during analysis.'}</p>
+        <div className="p-4 bg-rose-50 border border-rose-200 rounded-2xl flex flex-col md:flex-row md:items-start md:justify-between gap-3">
+          <div>
+            <h3 className="font-semibold text-rose-700 mb-2">Analysis failed</h3>
+            <p className="text-rose-600">{analysis.error_message || 'An error occurred during analysis.'}</p>
+            {resumeError && <p className="text-sm text-rose-700 mt-2">{resumeError}</p>}
+          </div>
+          <button
+            type="button"
+            onClick={handleResume}
+            disabled={resuming}
+            title="Completed stages are kept; only the missing ones run again."
+            className="inline-flex items-center justify-center gap-2 px-4 py-2 rounded-full bg-ink-900 text-white text-xs font-medium disabled:opacity-60 shrink-0"
+          >
+            {resuming ? <Loader2 className="h-4 w-4 animate-spin" /> : <RotateCcw className="h-4 w-4" />}
+            {resuming ? 'Resuming...' : 'Resume analysis'}
+          </button>
         </div>
       )}
 
@@ -1,4 +1,4 @@
-import { useMemo, useState, useEffect } from 'react'
+import { useMemo, useState, useEffect, useRef } from 'react'
 import { useNavigate, Link } from 'react-router-dom'
 import {
   Upload,
@@ -196,6 +196,11 @@ const downloadTemplate = () => {
   URL.revokeObjectURL(link.href)
 }
 
+// crypto.randomUUID is only available in secure contexts (https or localhost).
+const newIdempotencyKey = () =>
+  window.crypto?.randomUUID?.() ??
+  `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}${Math.random().toString(36).slice(2)}`
+
 const InputPage = () => {
   const navigate = useNavigate()
   const [inputMode, setInputMode] = useState('upload')
@@ -207,6 +212,13 @@ const InputPage = () => {
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState(null)
   const [recentAnalyses, setRecentAnalyses] = useState([])
+  // One key per submission: retries of the same data reuse it so the backend
+  // returns the existing analysis instead of starting a duplicate.
+  const idempotencyKey = useRef(null)
+
+  useEffect(() => {
+    idempotencyKey.current = null
+  }, [inputMode, inputData, parsedData, analysisName])
 
   useEffect(() => {
     const fetchRecent = async () => {
@@ -251,9 +263,21 @@ const InputPage = () => {
         throw new Error('No data provided for analysis.')
       }
 
-      const result = await submitAnalysis({ ...payload, name: analysisName.trim() })
+      if (!idempotencyKey.current) {
+        idempotencyKey.current = newIdempotencyKey()
+      }
+      const result = await submitAnalysis(
+        { ...payload, name: analysisName.trim() },
+        idempotencyKey.current
+      )
+      idempotencyKey.current = null
       navigate(`/dashboard/${result.analysis_id}`)
     } catch (err) {
+      // Keep the key only when the outcome is unknown (no response) or the first
+      // attempt is still starting (409); any other answer is final for this key.
+      if (err.response && err.response.status !== 409) {
+        idempotencyKey.current = null
+      }
       if (err instanceof SyntaxError) {
         setError('Invalid JSON format. Please check your input.')
       } else {
@@ -31,8 +31,9 @@ export const login = async (email, password) => {
   return response.data
 }
 
-export const submitAnalysis = async (data) => {
-  const response = await api.post('/analyze/', data)
+export const submitAnalysis = async (data, idempotencyKey) => {
+  const headers = idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {}
+  const response = await api.post('/analyze/', data, { headers })
   return response.data
 }
 
@@ -46,6 +47,11 @@ export const listAnalyses = async () => {
   return response.data
 }
 
+export const resumeAnalysis = async (analysisId) => {
+  const response = await api.post(`/analyses/${analysisId}/resume/`)
+  return response.data
+}
+
 export const deleteAnalysis = async (analysisId) => {
   const response = await api.delete(`/analyses/${analysisId}/`)
   return response.data